@@ -0,0 +1,227 @@
+import argparse
+import difflib
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from artifact_writer import ArtifactWriter
+from workspace_snapshot import get_snapshot, invalidate
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class ArtifactStore:
+    # Blobs are stored once by sha256 under blobs/; a manifest maps the paths of one
+    # snapshot of output/ to blob hashes, so a snapshot costs a small JSON file.
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.manifest_dir = os.path.join(self.root, "manifests")
+        self.snapshot_dir = os.path.join(self.root, "snapshots")
+        for directory in (self.blob_dir, self.manifest_dir, self.snapshot_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def for_workspace(cls, workspace):
+        # ARTIFACT_STORE_DIR shares one store (and its deduplication) across runs and jobs
+        return cls(os.path.expanduser(os.environ.get("ARTIFACT_STORE_DIR") or os.path.join(workspace, ".artifacts")))
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        # Writers share the lock; gc takes it exclusively so it never drops a blob mid-snapshot
+        with open(os.path.join(self.root, "store.lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest[2:])
+
+    def put_blob(self, data, digest=None):
+        digest = digest or hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, data)
+            # Blobs are shared by hardlinks, so nobody may edit one in place
+            os.chmod(path, 0o444)
+        return digest
+
+    def read_blob(self, digest):
+        with open(self.blob_path(digest), 'rb') as f:
+            return f.read()
+
+    def snapshot(self, directory, label, **meta):
+        files = {}
+        with self._locked():
+            for entry in get_snapshot(directory):
+                self.put_blob(entry.data, entry.sha256)
+                files[entry.path] = {"sha256": entry.sha256, "size": entry.size}
+            content = json.dumps(files, sort_keys=True).encode()
+            manifest = {
+                "id": f"{int(time.time() * 1000)}-{hashlib.sha256(content).hexdigest()[:8]}",
+                "created": time.time(),
+                "label": label,
+                "source": os.path.abspath(directory),
+                "meta": meta,
+                "files": files
+            }
+            self._save(manifest)
+        return manifest
+
+    def _save(self, manifest):
+        _write_atomic(os.path.join(self.manifest_dir, f"{manifest['id']}.json"), json.dumps(manifest, indent=2).encode())
+
+    def annotate(self, manifest_id, **meta):
+        manifest = self.get(manifest_id)
+        manifest["meta"].update(meta)
+        self._save(manifest)
+        return manifest
+
+    def get(self, manifest_id):
+        with open(os.path.join(self.manifest_dir, f"{manifest_id}.json"), 'r') as f:
+            return json.load(f)
+
+    def manifests(self):
+        manifests = []
+        for name in os.listdir(self.manifest_dir):
+            if name.endswith(".json"):
+                with open(os.path.join(self.manifest_dir, name), 'r') as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda manifest: manifest["created"])
+
+    def diff(self, old_id, new_id):
+        # Hash comparison only; no file contents are read
+        old, new = self.get(old_id)["files"], self.get(new_id)["files"]
+        return {
+            "added": sorted(path for path in new if path not in old),
+            "removed": sorted(path for path in old if path not in new),
+            "modified": sorted(path for path in new if path in old and new[path]["sha256"] != old[path]["sha256"]),
+            "unchanged": sum(1 for path in new if path in old and new[path]["sha256"] == old[path]["sha256"])
+        }
+
+    def unified_diff(self, old_id, new_id):
+        old, new = self.get(old_id)["files"], self.get(new_id)["files"]
+        changes = self.diff(old_id, new_id)
+        parts = []
+        for path in changes["removed"] + changes["modified"] + changes["added"]:
+            before = self.read_blob(old[path]["sha256"]).decode("utf-8", errors="replace") if path in old else ""
+            after = self.read_blob(new[path]["sha256"]).decode("utf-8", errors="replace") if path in new else ""
+            for line in difflib.unified_diff(
+                before.splitlines(keepends=True), after.splitlines(keepends=True),
+                fromfile=f"{old_id}/{path}", tofile=f"{new_id}/{path}"
+            ):
+                parts.append(line if line.endswith("\n") else line + "\n")
+        return "".join(parts)
+
+    def materialize(self, manifest_id, target=None):
+        # Hardlink every file to its blob: a full, read-only tree for the price of directory entries
+        target = target or os.path.join(self.snapshot_dir, manifest_id)
+        if os.path.isdir(target):
+            return target
+        staging = tempfile.mkdtemp(prefix=".materialize-", dir=os.path.dirname(os.path.abspath(target)))
+        for path, info in self.get(manifest_id)["files"].items():
+            destination = os.path.join(staging, path)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            try:
+                os.link(self.blob_path(info["sha256"]), destination)
+            except OSError:
+                # Different filesystem or no hardlink support
+                shutil.copyfile(self.blob_path(info["sha256"]), destination)
+        try:
+            os.replace(staging, target)
+        except OSError:
+            # Someone else materialized the same snapshot first
+            shutil.rmtree(staging, ignore_errors=True)
+        return target
+
+    def rollback(self, manifest_id, output_dir):
+        manifest = self.get(manifest_id)
+        # Copies, not links: output/ keeps being edited and must never write through to a blob
+        files = {path: self.read_blob(info["sha256"]) for path, info in manifest["files"].items()}
+        writer = ArtifactWriter(output_dir)
+        changes = writer.commit(files)
+        removed = writer.prune(files)
+        invalidate(output_dir)
+        self.snapshot(output_dir, f"rollback to {manifest_id}", rollback_of=manifest_id)
+        return changes, removed
+
+    def gc(self, keep_last=None):
+        # Drop old manifests (approved ones are always kept), then every blob no manifest references
+        removed_manifests = 0
+        removed_blobs = 0
+        freed = 0
+        with self._locked(exclusive=True):
+            manifests = self.manifests()
+            if keep_last is not None:
+                for manifest in manifests[:max(0, len(manifests) - keep_last)]:
+                    if manifest["meta"].get("decision", "").startswith("APPROVED"):
+                        continue
+                    os.remove(os.path.join(self.manifest_dir, f"{manifest['id']}.json"))
+                    shutil.rmtree(os.path.join(self.snapshot_dir, manifest["id"]), ignore_errors=True)
+                    removed_manifests += 1
+                manifests = self.manifests()
+
+            referenced = {info["sha256"] for manifest in manifests for info in manifest["files"].values()}
+            for prefix in os.listdir(self.blob_dir):
+                for name in os.listdir(os.path.join(self.blob_dir, prefix)):
+                    if prefix + name not in referenced:
+                        path = os.path.join(self.blob_dir, prefix, name)
+                        freed += os.path.getsize(path)
+                        os.remove(path)
+                        removed_blobs += 1
+        return {"manifests_removed": removed_manifests, "blobs_removed": removed_blobs, "bytes_freed": freed}
+
+    def stats(self):
+        blobs = 0
+        size = 0
+        for prefix in os.listdir(self.blob_dir):
+            for name in os.listdir(os.path.join(self.blob_dir, prefix)):
+                blobs += 1
+                size += os.path.getsize(os.path.join(self.blob_dir, prefix, name))
+        manifests = self.manifests()
+        logical = sum(info["size"] for manifest in manifests for info in manifest["files"].values())
+        return {"manifests": len(manifests), "blobs": blobs, "bytes": size, "logical_bytes": logical}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and manage the artifact store of a workspace")
+    parser.add_argument("--workspace", default=os.path.dirname(os.path.abspath(__file__)))
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    diff_parser = commands.add_parser("diff")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    checkout_parser = commands.add_parser("checkout", help="Materialize a snapshot with hardlinks")
+    checkout_parser.add_argument("id")
+    rollback_parser = commands.add_parser("rollback", help="Restore output/ to a snapshot")
+    rollback_parser.add_argument("id")
+    gc_parser = commands.add_parser("gc")
+    gc_parser.add_argument("--keep-last", type=int)
+    args = parser.parse_args()
+
+    store = ArtifactStore.for_workspace(args.workspace)
+    if args.command == "list":
+        for manifest in store.manifests():
+            decision = manifest["meta"].get("decision", "")
+            print(f"{manifest['id']}  {manifest['label']:<24} {len(manifest['files']):>4} files  {decision[:40]}")
+        stats = store.stats()
+        print(f"\n📦 {stats['manifests']} snapshots, {stats['blobs']} blobs, {stats['bytes']} bytes "
+              f"stored for {stats['logical_bytes']} bytes of snapshots")
+    elif args.command == "diff":
+        print(store.unified_diff(args.old, args.new))
+    elif args.command == "checkout":
+        print(f"📁 {store.materialize(args.id)}")
+    elif args.command == "rollback":
+        changes, removed = store.rollback(args.id, os.path.join(args.workspace, "output"))
+        print(f"⏪ Rolled back output/ to {args.id}: {changes.summary()}, {len(removed)} removed")
+    elif args.command == "gc":
+        print(f"🧹 {store.gc(keep_last=args.keep_last)}")
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from workspace_snapshot import get_snapshot, invalidate
+
+BLOCK_HEADER = re.compile(r'^### (FILENAME|PATCH):(.*)$')
+
+class FileBlockParser:
+    # Single-pass, incremental parser for "### FILENAME: path" (and "### PATCH: path") blocks
+    # followed by a fenced code block. Feed it the whole response or chunks as they stream in.
+    def __init__(self):
+        self._pending = ""
+        self._header = None
+        self._lines = None
+        self._seen_header = False
+        self._preamble = []
+
+    def feed(self, text):
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        completed = []
+        for line in lines:
+            block = self._process_line(line)
+            if block:
+                completed.append(block)
+        return completed
+
+    def close(self):
+        completed = []
+        if self._pending:
+            block = self._process_line(self._pending)
+            self._pending = ""
+            if block:
+                completed.append(block)
+        return completed
+
+    def unparsed_text(self):
+        # Raw text is only kept until the first file header shows up, for the fallback path
+        return "\n".join(self._preamble) if not self._seen_header else ""
+
+    def _process_line(self, line):
+        if self._lines is not None:
+            if line.strip().startswith("```"):
+                kind, filename = self._header
+                block = (kind, filename, "\n".join(self._lines))
+                self._header = None
+                self._lines = None
+                return block
+            self._lines.append(line)
+            return None
+
+        header = BLOCK_HEADER.match(line)
+        if header:
+            self._seen_header = True
+            self._preamble = []
+            self._header = ("patch" if header.group(1) == "PATCH" else "file", header.group(2).strip())
+        elif self._header is not None and line.startswith("```"):
+            rest = re.sub(r'^```[a-z]*', '', line)
+            self._lines = [rest] if rest.strip() else []
+        else:
+            if not self._seen_header:
+                self._preamble.append(line)
+            self._header = None
+        return None
+
+def parse_file_blocks(content):
+    parser = FileBlockParser()
+    return parser.feed(content) + parser.close()
+
+class UnsafePathError(ValueError):
+    pass
+
+class ChangeSet:
+    def __init__(self):
+        self.added = []
+        self.modified = []
+        self.unchanged = []
+        self.rejected = []
+
+    @property
+    def changed(self):
+        return self.added + self.modified
+
+    def __bool__(self):
+        return bool(self.added or self.modified)
+
+    def summary(self):
+        parts = [f"{len(self.added)} added", f"{len(self.modified)} modified", f"{len(self.unchanged)} unchanged"]
+        if self.rejected:
+            parts.append(f"{len(self.rejected)} rejected")
+        return ", ".join(parts)
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+class ArtifactWriter:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def resolve(self, filename):
+        filename = filename.strip().replace("\\", "/")
+        path = os.path.normpath(os.path.join(self.root, filename))
+        if not filename or os.path.isabs(filename) or not path.startswith(self.root + os.sep):
+            raise UnsafePathError(f"Refusing to write outside the output directory: {filename!r}")
+        return path
+
+    def commit(self, files):
+        changes = ChangeSet()
+        pending = []
+        for filename, content in files.items():
+            try:
+                path = self.resolve(filename)
+            except UnsafePathError as e:
+                print(f"   ⚠️  {e}")
+                changes.rejected.append(filename)
+                continue
+            data = content if isinstance(content, bytes) else content.encode("utf-8")
+            rel_path = os.path.relpath(path, self.root)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    if _sha256(f.read()) == _sha256(data):
+                        # Leave the file (and its mtime) alone so downstream caches stay valid
+                        changes.unchanged.append(rel_path)
+                        continue
+                changes.modified.append(rel_path)
+            else:
+                changes.added.append(rel_path)
+            pending.append((path, data))
+
+        if not pending:
+            return changes
+
+        # Stage the whole set next to the output directory (same filesystem), then rename
+        # each file into place. A crash while staging leaves output/ untouched.
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(self.root))
+        try:
+            staged = []
+            for index, (path, data) in enumerate(pending):
+                staged_path = os.path.join(staging, str(index))
+                with open(staged_path, 'wb') as f:
+                    f.write(data)
+                staged.append((staged_path, path))
+            for staged_path, path in staged:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(staged_path, path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return changes
+
+    def prune(self, keep):
+        # Delete files (and then empty directories) that are not in keep; never the root itself
+        removed = []
+        # A fresh walk: the cached snapshot may predate files written since
+        invalidate(self.root)
+        for entry in get_snapshot(self.root):
+            if entry.path not in keep:
+                os.remove(entry.abs_path)
+                removed.append(entry.path)
+        directories = set()
+        for path in removed:
+            while os.path.dirname(path):
+                path = os.path.dirname(path)
+                directories.add(path)
+        # Deepest first
+        for directory in sorted(directories, key=lambda path: path.count(os.sep), reverse=True):
+            try:
+                os.rmdir(os.path.join(self.root, directory))
+            except OSError:
+                # Still holds files that are kept
+                pass
+        return removed
@@ -0,0 +1,627 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import struct
+import sys
+import tempfile
+from local_checks import EXTERNAL_PREFIXES
+from workspace_snapshot import get_snapshot, invalidate
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FINGERPRINT_EXTENSIONS = {".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif", ".ico",
+                          ".woff", ".woff2", ".ttf", ".otf"}
+PRECOMPRESS_EXTENSIONS = {".html", ".htm", ".css", ".js", ".mjs", ".svg", ".json", ".xml", ".txt", ".map"}
+MIN_PRECOMPRESS_SIZE = 256
+# name.0123abcd.ext, also used by the preview server to mark responses as immutable
+FINGERPRINT_NAME = re.compile(r'\.[0-9a-f]{8}\.\w+$')
+ASSET_TYPES = {
+    ".css": "css", ".js": "js", ".mjs": "js",
+    ".png": "image", ".jpg": "image", ".jpeg": "image", ".gif": "image", ".svg": "image", ".webp": "image",
+    ".avif": "image", ".ico": "image",
+    ".woff": "font", ".woff2": "font", ".ttf": "font", ".otf": "font",
+}
+
+HTML_REF = re.compile(r'''\b(?:src|href|poster)\s*=\s*(["']?)(?P<url>[^"'\s>]+)\1''', re.IGNORECASE)
+SRCSET = re.compile(r'''\bsrcset\s*=\s*(["'])(?P<url>[^"']+)\1''', re.IGNORECASE)
+CSS_URL = re.compile(r'''url\(\s*(["']?)(?P<url>[^"')\s]+)\1\s*\)''', re.IGNORECASE)
+CSS_IMPORT = re.compile(r'''@import\s+(["'])(?P<url>[^"']+)\1''', re.IGNORECASE)
+HTML_BLOCK = re.compile(r'(<!--.*?-->|<(pre|textarea|script|style)\b[^>]*>.*?</\2\s*>|<[^>]+>)',
+                        re.DOTALL | re.IGNORECASE)
+SCRIPT_BODY = re.compile(r'<script\b([^>]*)>(.*?)</script\s*>', re.DOTALL | re.IGNORECASE)
+CSS_TOKEN = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)''', re.DOTALL)
+CSS_SELECTOR_NAME = re.compile(r'[.#](-?[_a-zA-Z][\w-]*)')
+CLASS_ATTR = re.compile(r'''\bclass\s*=\s*(["'])([^"']*)\1''', re.IGNORECASE)
+ID_ATTR = re.compile(r'''\bid\s*=\s*(["'])([^"']*)\1''', re.IGNORECASE)
+
+# A space next to one of these never separates two tokens
+JS_TIGHT = set("{}()[];,:=&|*%^~")
+JS_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do",
+                     "else", "yield", "await"}
+
+class MinifyError(ValueError):
+    pass
+
+def minify_css(text):
+    parts = []
+    last = 0
+    for match in CSS_TOKEN.finditer(text):
+        parts.append(_squeeze_css(text[last:match.start()]))
+        string, comment = match.groups()
+        if string:
+            parts.append(string)
+        elif comment.startswith("/*!"):
+            # License comments stay
+            parts.append(comment)
+        last = match.end()
+    parts.append(_squeeze_css(text[last:]))
+    return "".join(parts).strip()
+
+def _squeeze_css(code):
+    # Anything the tokenizer left unmatched is an unterminated string or comment
+    if re.search(r'["\']|/\*', code):
+        raise MinifyError("unterminated string or comment")
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+    code = re.sub(r':\s+', ':', code)
+    return code.replace(";}", "}")
+
+# The scanners below return the index just past the literal, or None when it is unterminated
+
+def _string_end(text, index):
+    quote = text[index]
+    index += 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == quote:
+            return index + 1
+        if char == "\n":
+            return None
+        index += 1
+    return None
+
+def _template_end(text, index):
+    index += 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "`":
+            return index + 1
+        if text.startswith("${", index):
+            index = _expression_end(text, index + 2)
+            if index is None:
+                return None
+            continue
+        index += 1
+    return None
+
+def _expression_end(text, index):
+    depth = 0
+    while index < len(text):
+        char = text[index]
+        if char in "'\"":
+            index = _string_end(text, index)
+        elif char == "`":
+            index = _template_end(text, index)
+        else:
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                if depth == 0:
+                    return index + 1
+                depth -= 1
+            index += 1
+        if index is None:
+            return None
+    return None
+
+def _regex_end(text, index):
+    in_class = False
+    index += 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "\n":
+            return None
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "/":
+            index += 1
+            while index < len(text) and (text[index].isalnum() or text[index] in "_$"):
+                index += 1
+            return index
+        index += 1
+    return None
+
+def _is_word(char):
+    return char.isalnum() or char in "_$" or ord(char) > 127
+
+def minify_js(text):
+    # Conservative: drops comments and whitespace, keeps newlines where ASI might need them,
+    # never renames anything. Strings, templates and regex literals are copied verbatim.
+    # Raises MinifyError rather than guessing when the source cannot be tokenized reliably.
+    out = []
+    pending = None
+    previous = ""
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char.isspace():
+            pending = "\n" if char == "\n" or pending == "\n" else " "
+            index += 1
+            continue
+        if text.startswith("//", index):
+            end = text.find("\n", index)
+            index = len(text) if end == -1 else end
+            continue
+        if text.startswith("/*", index):
+            end = text.find("*/", index + 2)
+            if end == -1:
+                raise MinifyError(f"unterminated comment at offset {index}")
+            comment = text[index:end + 2]
+            if not comment.startswith("/*!"):
+                index = end + 2
+                pending = "\n" if "\n" in comment or pending == "\n" else pending or " "
+                continue
+            token = comment
+        elif char in "'\"`":
+            end = _template_end(text, index) if char == "`" else _string_end(text, index)
+            if end is None:
+                raise MinifyError(f"unterminated string at offset {index}")
+            token = text[index:end]
+        elif char == "/" and (not previous or previous in JS_REGEX_KEYWORDS
+                              or not (_is_word(previous[-1]) or previous[-1] in ")]}'\"`")):
+            end = _regex_end(text, index)
+            if end is None:
+                raise MinifyError(f"unterminated regular expression at offset {index}")
+            token = text[index:end]
+        elif char == "/" and previous[-1] in ")}":
+            # "if (x) /a+/.test(s)" or "(a) / b / c": without whitespace or quotes up to the next
+            # slash, copying that span verbatim is right under both readings
+            end = _regex_end(text, index)
+            if end is None:
+                token = char
+            elif re.search(r'[\s\'"`]', text[index + 1:end]):
+                raise MinifyError(f"ambiguous '/' after {previous!r} at offset {index}")
+            else:
+                token = text[index:end]
+        elif _is_word(char):
+            end = index
+            while end < len(text) and _is_word(text[end]):
+                end += 1
+            token = text[index:end]
+        else:
+            token = char
+
+        if pending and out:
+            before, after = out[-1][-1], token[0]
+            if pending == "\n":
+                if not (before in "{;,(" or after in "});,]"):
+                    out.append("\n")
+            elif not (before in JS_TIGHT or after in JS_TIGHT):
+                out.append(" ")
+        pending = None
+        out.append(token)
+        previous = token
+        index += len(token)
+    return "".join(out)
+
+def minify_html(text):
+    parts = []
+    last = 0
+    for match in HTML_BLOCK.finditer(text):
+        parts.append(_squeeze_text(text[last:match.start()]))
+        block = match.group(0)
+        tag = (match.group(2) or "").lower()
+        if block.startswith("<!--"):
+            # Conditional comments are markup, not comments
+            if block.startswith("<!--[if"):
+                parts.append(block)
+        elif tag in ("script", "style"):
+            open_end = block.index(">") + 1
+            close_start = block.lower().rindex("</")
+            body = block[open_end:close_start]
+            script_type = re.search(r'''\btype\s*=\s*["']?([^"'\s>]+)''', block[:open_end], re.IGNORECASE)
+            try:
+                if tag == "style":
+                    body = minify_css(body)
+                elif not script_type or script_type.group(1).lower() in ("module", "text/javascript",
+                                                                          "application/javascript"):
+                    body = minify_js(body)
+            except MinifyError:
+                # Kept as written; the rest of the page is still minified
+                pass
+            parts.append(block[:open_end] + body + block[close_start:])
+        else:
+            parts.append(block)
+        last = match.end()
+    parts.append(_squeeze_text(text[last:]))
+    return "".join(parts).strip()
+
+def _squeeze_text(text):
+    return re.sub(r'\s+', lambda match: "\n" if "\n" in match.group(0) else " ", text)
+
+MINIFIERS = {".html": minify_html, ".htm": minify_html, ".css": minify_css, ".js": minify_js, ".mjs": minify_js}
+
+def _resolve(files, base, url):
+    url = url.strip()
+    if not url or url.lower().startswith(EXTERNAL_PREFIXES) or "{{" in url:
+        return None
+    target = url.split("#")[0].split("?")[0]
+    if not target:
+        return None
+    path = target.lstrip("/") if target.startswith("/") else posixpath.join(posixpath.dirname(base), target)
+    path = posixpath.normpath(path)
+    return path if path in files else None
+
+def _patterns(path):
+    extension = posixpath.splitext(path)[1].lower()
+    if extension in (".html", ".htm"):
+        return (HTML_REF, SRCSET, CSS_URL, CSS_IMPORT)
+    if extension == ".css":
+        return (CSS_URL, CSS_IMPORT)
+    return ()
+
+def _urls(pattern, value):
+    if pattern is SRCSET:
+        return [candidate.split()[0] for candidate in value.split(",") if candidate.strip()]
+    return [value]
+
+def references(files, path, text):
+    found = []
+    for pattern in _patterns(path):
+        for match in pattern.finditer(text):
+            for url in _urls(pattern, match.group("url")):
+                target = _resolve(files, path, url)
+                if target and target not in found:
+                    found.append(target)
+    return found
+
+def _rewrite(files, path, text, renamed):
+    def rewrite_url(url):
+        target = _resolve(files, path, url)
+        if target not in renamed:
+            return url
+        split = min([position for position in (url.find("?"), url.find("#")) if position != -1] or [len(url)])
+        name, suffix = url[:split], url[split:]
+        basename = posixpath.basename(target)
+        if not name.endswith(basename):
+            return url
+        return name[:-len(basename)] + posixpath.basename(renamed[target]) + suffix
+
+    for pattern in _patterns(path):
+        def replace(match):
+            value = match.group("url")
+            if pattern is SRCSET:
+                new = ", ".join(
+                    " ".join([rewrite_url(candidate.split()[0])] + candidate.split()[1:])
+                    for candidate in value.split(",") if candidate.strip()
+                )
+            else:
+                new = rewrite_url(value)
+            start, end = match.start("url") - match.start(), match.end("url") - match.start()
+            return match.group(0)[:start] + new + match.group(0)[end:]
+        text = pattern.sub(replace, text)
+    return text
+
+def fingerprint(path, data):
+    stem, extension = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:8]}{extension}"
+
+def image_size(data):
+    # (width, height) from the PNG, GIF or JPEG header, None for anything else
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:2] == b"\xff\xd8":
+        index = 2
+        while index + 9 <= len(data):
+            if data[index] != 0xFF:
+                index += 1
+                continue
+            marker = data[index + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                index += 2
+                continue
+            length = struct.unpack(">H", data[index + 2:index + 4])[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[index + 5:index + 9])
+                return width, height
+            index += 2 + length
+    return None
+
+def compress(data):
+    encodings = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(data, quality=11)
+    # Only keep encodings that actually pay off
+    return {name: body for name, body in encodings.items() if len(body) < len(data)}
+
+class BudgetConfig:
+    def __init__(self, page_kb=500.0, js_kb=150.0, css_kb=50.0, image_kb=200.0, image_px=2000):
+        self.page_kb = page_kb
+        self.js_kb = js_kb
+        self.css_kb = css_kb
+        self.image_kb = image_kb
+        self.image_px = image_px
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            page_kb=float(os.environ.get("BUDGET_PAGE_KB", "500")),
+            js_kb=float(os.environ.get("BUDGET_JS_KB", "150")),
+            css_kb=float(os.environ.get("BUDGET_CSS_KB", "50")),
+            image_kb=float(os.environ.get("BUDGET_IMAGE_KB", "200")),
+            image_px=int(os.environ.get("BUDGET_IMAGE_PX", "2000"))
+        )
+
+class OptimizationReport:
+    def __init__(self, config, dist_dir):
+        self.config = config
+        self.dist_dir = dist_dir
+        # source path -> {"dist", "original", "minified", "gzip", "br"} in bytes
+        self.files = {}
+        self.renamed = {}
+        # page -> {"html", "css", "js", "image", "font"} transfer bytes
+        self.pages = {}
+        self.unused_css = {}
+        self.oversized_images = []
+        self.unminified = []
+
+    @property
+    def original_bytes(self):
+        return sum(info["original"] for info in self.files.values())
+
+    @property
+    def minified_bytes(self):
+        return sum(info["minified"] for info in self.files.values())
+
+    def warnings(self):
+        problems = [f"{path}: {reason}" for path, reason in self.oversized_images]
+        problems += [f"{path}: not minified, {reason}" for path, reason in self.unminified]
+        for path, names in self.unused_css.items():
+            shown = ", ".join(names[:10]) + (f" and {len(names) - 10} more" if len(names) > 10 else "")
+            problems.append(f"{path}: {len(names)} selector name(s) not used by any page or script: {shown}")
+        return problems
+
+    def violations(self):
+        problems = []
+        for page, weights in self.pages.items():
+            total = sum(weights.values()) / 1024
+            if total > self.config.page_kb:
+                problems.append(f"{page}: page weight {total:.1f}KB > {self.config.page_kb:.0f}KB")
+            if weights["js"] / 1024 > self.config.js_kb:
+                problems.append(f"{page}: JavaScript {weights['js'] / 1024:.1f}KB > {self.config.js_kb:.0f}KB")
+            if weights["css"] / 1024 > self.config.css_kb:
+                problems.append(f"{page}: CSS {weights['css'] / 1024:.1f}KB > {self.config.css_kb:.0f}KB")
+        return problems
+
+    @property
+    def passed(self):
+        return not self.violations()
+
+    def summary(self):
+        saved = 1 - self.minified_bytes / self.original_bytes if self.original_bytes else 0
+        lines = [
+            f"{'PASSED' if self.passed else 'FAILED'}: {len(self.files)} files minified from "
+            f"{self.original_bytes / 1024:.1f}KB to {self.minified_bytes / 1024:.1f}KB ({saved:.0%} smaller), "
+            f"{len(self.renamed)} fingerprinted, precompressed with {'gzip and brotli' if brotli else 'gzip'}"
+        ]
+        for page, weights in self.pages.items():
+            parts = ", ".join(f"{kind} {size / 1024:.1f}KB" for kind, size in weights.items() if size)
+            lines.append(f"- {page}: {sum(weights.values()) / 1024:.1f}KB transferred ({parts})")
+        lines += [f"- VIOLATION {problem}" for problem in self.violations()]
+        lines += [f"- WARNING {problem}" for problem in self.warnings()]
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            "passed": self.passed,
+            "budget": vars(self.config),
+            "pages": self.pages,
+            "files": self.files,
+            "renamed": self.renamed,
+            "unused_css": self.unused_css,
+            "oversized_images": [{"path": path, "reason": reason} for path, reason in self.oversized_images],
+            "unminified": [{"path": path, "reason": reason} for path, reason in self.unminified],
+            "violations": self.violations(),
+            "warnings": self.warnings()
+        }
+
+def _unused_selectors(sources):
+    used = set()
+    for path, text in sources.items():
+        extension = posixpath.splitext(path)[1].lower()
+        if extension in (".html", ".htm"):
+            for _, value in CLASS_ATTR.findall(text) + ID_ATTR.findall(text):
+                used.update(value.split())
+            for _, body in SCRIPT_BODY.findall(text):
+                used.update(re.findall(r'[\w-]+', body))
+        elif extension in (".js", ".mjs", ".json"):
+            # Names built or toggled by scripts count as used
+            used.update(re.findall(r'[\w-]+', text))
+
+    unused = {}
+    for path, text in sources.items():
+        if posixpath.splitext(path)[1].lower() != ".css":
+            continue
+        names = []
+        for selector in re.findall(r'([^{}]+)\{', CSS_TOKEN.sub("", text)):
+            if selector.strip().startswith("@"):
+                continue
+            names += [name for name in CSS_SELECTOR_NAME.findall(selector) if name not in used and name not in names]
+        if names:
+            unused[path] = names
+    return unused
+
+def optimize_site(source_dir, dist_dir, config=None):
+    config = config or BudgetConfig.from_env()
+    report = OptimizationReport(config, dist_dir)
+    sources = {}
+    for entry in get_snapshot(source_dir):
+        path = entry.path.replace(os.sep, "/")
+        # Dotfiles are never served
+        if not any(part.startswith(".") for part in path.split("/")):
+            sources[path] = entry.data
+
+    contents = {}
+    texts = {}
+    for path, data in sources.items():
+        minifier = MINIFIERS.get(posixpath.splitext(path)[1].lower())
+        if minifier:
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                text = None
+            if text is not None:
+                try:
+                    text = minifier(text)
+                except MinifyError as e:
+                    # Shipped as written (references are still rewritten) rather than risk breaking it
+                    report.unminified.append((path, str(e)))
+                texts[path] = text
+                data = text.encode("utf-8")
+        elif posixpath.splitext(path)[1].lower() in PRECOMPRESS_EXTENSIONS:
+            try:
+                texts[path] = data.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        contents[path] = data
+        report.files[path] = {"dist": path, "original": len(sources[path]), "minified": len(data)}
+
+    # Only assets referenced from HTML or CSS are renamed, and never one a script or data
+    # file mentions by name: those references cannot be rewritten safely
+    graph = {path: references(contents, path, text) for path, text in texts.items()}
+    mentioned = "\n".join(
+        [text for path, text in texts.items() if not _patterns(path)]
+        + [body for path, text in texts.items() if path.endswith((".html", ".htm"))
+           for _, body in SCRIPT_BODY.findall(text)]
+    )
+    renamable = {
+        target for targets in graph.values() for target in targets
+        if posixpath.splitext(target)[1].lower() in FINGERPRINT_EXTENSIONS and posixpath.basename(target) not in mentioned
+    }
+
+    done = {}
+    visiting = set()
+
+    def build(path):
+        # Dependencies first, so a stylesheet's hash covers the renamed images it points to
+        if path in done or path in visiting:
+            return
+        visiting.add(path)
+        for target in graph.get(path, []):
+            build(target)
+        data = contents[path]
+        if graph.get(path):
+            data = _rewrite(contents, path, texts[path], report.renamed).encode("utf-8")
+        name = fingerprint(path, data) if path in renamable else path
+        if name != path:
+            report.renamed[path] = name
+        report.files[path]["dist"] = name
+        done[path] = data
+
+    for path in contents:
+        build(path)
+
+    dist = {}
+    for source, data in done.items():
+        info = report.files[source]
+        dist[info["dist"]] = data
+        if posixpath.splitext(source)[1].lower() in PRECOMPRESS_EXTENSIONS and len(data) >= MIN_PRECOMPRESS_SIZE:
+            for encoding, body in compress(data).items():
+                dist[f"{info['dist']}.{'gz' if encoding == 'gzip' else 'br'}"] = body
+                info[encoding] = len(body)
+    if report.renamed:
+        dist["asset-manifest.json"] = json.dumps(report.renamed, indent=2, sort_keys=True).encode("utf-8")
+
+    for path, data in done.items():
+        if ASSET_TYPES.get(posixpath.splitext(path)[1].lower()) != "image":
+            continue
+        if len(data) / 1024 > config.image_kb:
+            report.oversized_images.append((path, f"{len(data) / 1024:.0f}KB > {config.image_kb:.0f}KB"))
+        size = image_size(data)
+        if size and max(size) > config.image_px:
+            report.oversized_images.append((path, f"{size[0]}x{size[1]}px, larger than {config.image_px}px"))
+    report.unused_css = _unused_selectors(texts)
+    _page_weights(report, dist)
+    _write_dist(dist_dir, dist)
+    return report
+
+def _transfer_size(info):
+    return min(size for size in (info["minified"], info.get("gzip"), info.get("br")) if size is not None)
+
+def _page_weights(report, dist):
+    by_dist = {info["dist"]: info for info in report.files.values()}
+    for page in sorted(path for path in by_dist if path.endswith((".html", ".htm"))):
+        weights = {"html": _transfer_size(by_dist[page]), "css": 0, "js": 0, "image": 0, "font": 0}
+        seen = {page}
+        pending = [page]
+        while pending:
+            path = pending.pop()
+            for target in references(dist, path, dist[path].decode("utf-8", errors="replace")):
+                kind = ASSET_TYPES.get(posixpath.splitext(target)[1].lower())
+                # Links to other pages and downloads are not part of this page's weight
+                if target in seen or target not in by_dist or kind is None:
+                    continue
+                seen.add(target)
+                weights[kind] += _transfer_size(by_dist[target])
+                if target.endswith(".css"):
+                    pending.append(target)
+        report.pages[page] = weights
+
+def _write_dist(dist_dir, files):
+    # Build next to dist/ and swap it in, so a preview server never sees a half-written site
+    dist_dir = os.path.abspath(dist_dir)
+    parent = os.path.dirname(dist_dir)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".dist-", dir=parent)
+    # mkdtemp is private (0700); dist/ has to be readable by whatever web server ships it
+    os.chmod(staging, 0o755)
+    for path, data in files.items():
+        destination = os.path.join(staging, *path.split("/"))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, 'wb') as f:
+            f.write(data)
+    old = None
+    if os.path.isdir(dist_dir):
+        old = tempfile.mkdtemp(prefix=".dist-old-", dir=parent)
+        os.rename(dist_dir, os.path.join(old, "dist"))
+    os.rename(staging, dist_dir)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+    invalidate(dist_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minify, fingerprint and precompress a static site")
+    parser.add_argument("source", help="Directory with the generated site")
+    parser.add_argument("dist", help="Directory to write the optimized site to")
+    parser.add_argument("--report", help="Write the page-weight report as JSON")
+    parser.add_argument("--fail-on-budget", action="store_true", help="Exit with status 1 when a budget is exceeded")
+    args = parser.parse_args()
+
+    report = optimize_site(args.source, args.dist)
+    print(report.summary())
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report.to_dict(), f, indent=2)
+    if args.fail_on_budget and not report.passed:
+        sys.exit(1)
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
+
+def load_requirements(path):
+    with open(path, 'r') as f:
+        text = f.read()
+
+    if path.endswith(".json"):
+        items = json.loads(text)
+    elif path.endswith(".jsonl"):
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        items = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+
+    jobs = []
+    for index, item in enumerate(items, start=1):
+        if isinstance(item, str):
+            item = {"requirement": item}
+        jobs.append({"id": str(item.get("id", f"job-{index:03d}")), "requirement": item["requirement"]})
+    return jobs
+
+def run_job(job):
+    # Runs in a worker process: each job gets its own workspace, port and log file
+    from orchestrator import Orchestrator
+
+    os.makedirs(job["workspace"], exist_ok=True)
+    log_file = os.path.join(job["workspace"], "run.log")
+    result = {
+        "id": job["id"],
+        "requirement": job["requirement"],
+        "workspace": job["workspace"],
+        "port": job["port"],
+        "log": log_file
+    }
+
+    start = time.time()
+    with open(log_file, 'w') as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            orchestrator = Orchestrator(
+                job["workspace"],
+                port=job["port"],
+                interactive=False,
+                deploy=job["deploy"]
+            )
+            approved = orchestrator.run(job["requirement"])
+            result["status"] = "approved" if approved else "rejected"
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "error"
+            result["error"] = str(e)
+    result["duration_s"] = round(time.time() - start, 3)
+    return result
+
+def _init_worker(rate_share):
+    # Every worker builds its own LLM client; they split LLM_RPM/LLM_TPM instead of each using all of it
+    os.environ["LLM_RATE_SHARE"] = str(rate_share)
+
+class BatchRunner:
+    def __init__(self, requirements_file, output_dir="batch_runs", workers=4, base_port=5100, deploy=True):
+        self.requirements_file = requirements_file
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = workers
+        self.base_port = base_port
+        self.deploy = deploy
+        self.summary_file = os.path.join(self.output_dir, "summary.json")
+
+    def run(self):
+        jobs = load_requirements(self.requirements_file)
+        for index, job in enumerate(jobs):
+            job["workspace"] = os.path.join(self.output_dir, job["id"])
+            job["port"] = self.base_port + index
+            job["deploy"] = self.deploy
+
+        print(f"\n📦 BATCH: {len(jobs)} job(s) on {self.workers} worker(s)")
+        start = time.time()
+        results = []
+        workers = max(1, min(self.workers, len(jobs)))
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(workers,)) as pool:
+            futures = {pool.submit(run_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"id": job["id"], "requirement": job["requirement"], "status": "error", "error": str(e)}
+                results.append(result)
+                print(f"   [{len(results)}/{len(jobs)}] {result['id']}: {result['status']} ({result.get('duration_s', 0)}s)")
+
+        results.sort(key=lambda result: result["id"])
+        summary = {
+            "requirements_file": self.requirements_file,
+            "workers": self.workers,
+            "total_jobs": len(jobs),
+            "approved": sum(1 for result in results if result["status"] == "approved"),
+            "wall_time_s": round(time.time() - start, 3),
+            "jobs": results
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"\n📊 {summary['approved']}/{len(jobs)} approved in {summary['wall_time_s']}s")
+        print(f"   Summary written to: {self.summary_file}")
+        return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build many projects in parallel")
+    parser.add_argument("requirements_file", help=".txt (one requirement per line), .json or .jsonl")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output-dir", default="batch_runs")
+    parser.add_argument("--base-port", type=int, default=5100)
+    parser.add_argument("--no-deploy", action="store_true", help="Skip the deployment check")
+    args = parser.parse_args()
+
+    BatchRunner(
+        args.requirements_file,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        base_port=args.base_port,
+        deploy=not args.no_deploy
+    ).run()
@@ -0,0 +1,171 @@
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from artifact_writer import FileBlockParser
+from coder_agent import CoderAgent
+from llm_client import LLMClient, ReplayBackend, set_client
+from orchestrator import Orchestrator
+from telemetry import get_tracer
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+SCENARIOS = ("static_html", "flask", "node")
+
+def _workspace():
+    return tempfile.mkdtemp(prefix="bench-")
+
+def _stage_times():
+    summary = get_tracer().summary()
+    stages = {agent: round(stats["step_s"], 6) for agent, stats in summary["agents"].items()}
+    for kind in ("io", "subprocess"):
+        stages[kind] = round(sum(span.duration for span in get_tracer().spans if span.kind == kind), 6)
+    return stages
+
+def run_scenario(name, repeat=3):
+    recording = os.path.join(BENCHMARK_DIR, f"{name}.json")
+    with open(recording, 'r') as f:
+        requirement = json.load(f)["requirement"]
+
+    def run_once(trace_memory=False):
+        # Fresh replay backend per run, no cache and no rate limiting: only orchestration is measured
+        set_client(LLMClient(ReplayBackend(recording)))
+        workspace = _workspace()
+        try:
+            orchestrator = Orchestrator(workspace, deploy=False, interactive=False)
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                approved = orchestrator.run(requirement)
+            wall = time.perf_counter() - start
+            peak = None
+            if trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            iterations = len([span for span in get_tracer().spans if span.kind == "iteration"])
+            return wall, _stage_times(), peak, approved, iterations
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    walls = []
+    stages = []
+    for _ in range(repeat):
+        wall, stage, _, approved, iterations = run_once()
+        walls.append(wall)
+        stages.append(stage)
+    # Memory is measured in a separate run: tracemalloc slows everything down
+    _, _, peak, _, _ = run_once(trace_memory=True)
+
+    return {
+        "approved": approved,
+        "iterations": iterations,
+        "wall_s": {"median": round(statistics.median(walls), 6), "min": round(min(walls), 6),
+                   "max": round(max(walls), 6)},
+        "stages_s": {key: round(statistics.median(stage.get(key, 0.0) for stage in stages), 6)
+                     for key in stages[0]},
+        "peak_memory_bytes": peak
+    }
+
+def synthetic_response(files, file_size):
+    line = "    <p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>\n"
+    body = line * max(1, file_size // len(line))
+    blocks = [f"### FILENAME: pages/page_{index:04d}.html\n```html\n{body}```\n" for index in range(files)]
+    return "\n".join(blocks)
+
+def run_stress(files=300, file_size=10000, repeat=3):
+    content = synthetic_response(files, file_size)
+    size_mb = len(content.encode()) / (1024 * 1024)
+
+    def measure(fn):
+        timings = []
+        for _ in range(repeat):
+            workspace = _workspace()
+            try:
+                coder = CoderAgent(workspace)
+                start = time.perf_counter()
+                fn(coder)
+                timings.append(time.perf_counter() - start)
+            finally:
+                shutil.rmtree(workspace, ignore_errors=True)
+        best = min(timings)
+        return {"best_s": round(best, 6), "mb_per_s": round(size_mb / best, 2)}
+
+    def parse_only(coder):
+        parser = FileBlockParser()
+        for start in range(0, len(content), 4096):
+            parser.feed(content[start:start + 4096])
+        parser.close()
+
+    def stream_and_write(coder):
+        parser = FileBlockParser()
+        for start in range(0, len(content), 4096):
+            for _, filename, code in parser.feed(content[start:start + 4096]):
+                coder._save_file(filename, code)
+
+    return {
+        "files": files,
+        "response_mb": round(size_mb, 2),
+        "parse_and_write": measure(lambda coder: coder._parse_and_save_files(content)),
+        "incremental_parse": measure(parse_only),
+        "incremental_parse_and_write": measure(stream_and_write)
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, baseline):
+    lines = [f"{'Scenario':<14} {'Baseline':>10} {'Current':>10} {'Change':>8}"]
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        old, new = before["wall_s"]["median"], result["wall_s"]["median"]
+        change = (new - old) / old * 100 if old else 0.0
+        lines.append(f"{name:<14} {old:>9.3f}s {new:>9.3f}s {change:>+7.1f}%")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline replay benchmarks for the orchestrator pipeline")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Run only these scenarios")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stress-files", type=int, default=300)
+    parser.add_argument("--stress-file-size", type=int, default=10000)
+    parser.add_argument("--skip-stress", action="store_true")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "scenarios": {}
+    }
+    for name in args.scenario or SCENARIOS:
+        print(f"⏱️  Scenario {name}...")
+        results["scenarios"][name] = run_scenario(name, repeat=args.repeat)
+        print(f"   median {results['scenarios'][name]['wall_s']['median']:.3f}s")
+    if not args.skip_stress:
+        print(f"⏱️  Stress: {args.stress_files} files...")
+        results["stress"] = run_stress(args.stress_files, args.stress_file_size, repeat=args.repeat)
+        print(f"   parse+write {results['stress']['parse_and_write']['mb_per_s']} MB/s")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📊 Results written to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print("\n" + compare(results, json.load(f)))
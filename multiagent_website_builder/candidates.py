@@ -0,0 +1,119 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from artifact_writer import ArtifactWriter
+from coder_agent import CoderAgent
+from local_checks import run_checks
+from telemetry import get_tracer, traced_submit
+from tester_agent import TesterAgent
+from workspace_snapshot import get_snapshot, invalidate
+
+DEFAULT_WEIGHTS = {"checks": 3.0, "warnings": 0.2, "tests": 2.0}
+
+def parse_weights(text):
+    # "checks=3,warnings=0.2,tests=2" -> dict, unknown names rejected early
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, _, value = item.partition("=")
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown candidate weight: {name}")
+        weights[name] = float(value)
+    return weights
+
+def temperatures(count, low=0.2, high=1.0):
+    # Spread sampling temperatures so candidates (and their cache keys) differ
+    if count == 1:
+        return [low]
+    return [round(low + (high - low) * index / (count - 1), 2) for index in range(count)]
+
+class Candidate:
+    def __init__(self, index, workspace, temperature):
+        self.index = index
+        self.workspace = workspace
+        self.temperature = temperature
+        self.code_dir = os.path.join(workspace, "output")
+        self.test_file = None
+        self.check_report = None
+        self.test_report = None
+        self.score = None
+        self.error = None
+
+    def describe(self):
+        if self.error:
+            return f"#{self.index} (t={self.temperature}): failed - {self.error}"
+        tests = self.test_report.summary().split("\n")[0] if self.test_report else "not run"
+        return (f"#{self.index} (t={self.temperature}): score {self.score}, "
+                f"checks {self.check_report.summary()}, tests {tests}")
+
+def score(check_report, test_report, weights):
+    if not check_report.ok:
+        return round(-weights["checks"] * len(check_report.failures), 3)
+    total = weights["checks"] - weights["warnings"] * len(check_report.warnings)
+    if test_report is not None and test_report.tests:
+        total += weights["tests"] * test_report.passed / len(test_report.tests)
+    return round(total, 3)
+
+class CandidatePool:
+    def __init__(self, workspace, count, weights=None, parallel_tests=False):
+        self.staging_root = os.path.join(workspace, "candidates")
+        self.count = count
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.parallel_tests = parallel_tests
+
+    def _build(self, candidate, requirement):
+        tracer = get_tracer()
+        with tracer.span("candidate", kind="candidate", candidate=candidate.index, temperature=candidate.temperature):
+            coder = CoderAgent(candidate.workspace, patch_mode=False)
+            coder.llm_params = {"temperature": candidate.temperature}
+            with tracer.span("coder.generate_code", kind="agent", agent="coder"):
+                coder.generate_code(requirement)
+            with tracer.span("checks.run_checks", kind="agent", agent="checks"):
+                candidate.check_report = run_checks(candidate.code_dir)
+            # Candidates that fail the local checks are not worth a test generation call
+            if candidate.check_report.ok:
+                tester = TesterAgent(candidate.workspace, parallel=self.parallel_tests)
+                with tracer.span("tester.generate_tests", kind="agent", agent="tester"):
+                    candidate.test_file = tester.generate_tests(candidate.code_dir)
+                with tracer.span("tester.run_tests", kind="agent", agent="tester"):
+                    candidate.test_report = tester.run_tests(candidate.code_dir)
+            candidate.score = score(candidate.check_report, candidate.test_report, self.weights)
+        return candidate
+
+    def run(self, requirement):
+        shutil.rmtree(self.staging_root, ignore_errors=True)
+        candidates = [
+            Candidate(index, os.path.join(self.staging_root, f"candidate_{index}"), temperature)
+            for index, temperature in enumerate(temperatures(self.count), 1)
+        ]
+        with ThreadPoolExecutor(max_workers=self.count) as pool:
+            futures = [traced_submit(pool, self._build, candidate, requirement) for candidate in candidates]
+            for candidate, future in zip(candidates, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    candidate.error = f"{type(e).__name__}: {e}"
+
+        for candidate in candidates:
+            print(f"   {candidate.describe()}")
+        scored = [candidate for candidate in candidates if candidate.error is None]
+        if not scored:
+            raise RuntimeError("Every candidate failed: " + "; ".join(candidate.error for candidate in candidates))
+        # Highest score wins; ties go to the lower temperature
+        return max(scored, key=lambda candidate: (candidate.score, -candidate.index))
+
+    def promote(self, candidate, output_dir):
+        # output/ must end up identical to the tree the candidate was tested in, so its test report
+        # can be reused: binary files are copied too, and files from earlier runs are removed
+        files = {}
+        for entry in get_snapshot(candidate.code_dir):
+            with open(entry.abs_path, 'rb') as f:
+                files[entry.path] = f.read()
+        writer = ArtifactWriter(output_dir)
+        changes = writer.commit(files)
+        removed = writer.prune(files)
+        if changes or removed:
+            invalidate(output_dir)
+        return changes, removed
+
+    def cleanup(self):
+        shutil.rmtree(self.staging_root, ignore_errors=True)
@@ -1,14 +1,40 @@
 import os
-from groq import Groq
+import re
+import time
+from artifact_writer import ArtifactWriter, FileBlockParser, parse_file_blocks
+from context_packer import ContextPacker
+from llm_client import get_client, estimate_tokens
+from patches import apply_unified_diff, PatchError
+from telemetry import get_tracer
+from workspace_snapshot import get_snapshot, invalidate
+
+# The deployer picks a free port and passes it in the PORT environment variable
+SERVER_PORT_RULE = ("If the project runs a server, it must listen on the port from the PORT environment variable "
+                    "(Python: int(os.environ.get('PORT', 5000)), Node: process.env.PORT || 5000).")
 
 class CoderAgent:
-    def __init__(self, workspace):
+    context_budget = 12000
+    
+    def __init__(self, workspace, stream=False, patch_mode=True):
         self.workspace = workspace
         self.code_file = os.path.join(workspace, "output")
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self.llm = get_client()
+        self.stream = stream
+        self.patch_mode = patch_mode
+        self.writer = ArtifactWriter(self.code_file)
+        self.last_changes = None
+        self.last_stream_stats = None
+        self.last_patch_stats = None
+        # Extra sampling parameters, e.g. a temperature per best-of-N candidate
+        self.llm_params = {}
         os.makedirs(self.code_file, exist_ok=True)
         
-    def generate_code(self, requirement, feedback=None):
+    def generate_code(self, requirement, feedback=None, stream=None, on_file=None):
+        if feedback and self.patch_mode and len(get_snapshot(self.code_file)):
+            if self._generate_patch(requirement, feedback):
+                return self.code_file
+            print("   ⚠️  Patch could not be applied, regenerating the full project")
+        
         if feedback:
             prompt = f"""You are an expert full-stack developer. Improve this project based on feedback.
 
@@ -17,7 +43,7 @@ REQUIREMENT: {requirement}
 FEEDBACK:
 {feedback}
 
-Generate complete, production-quality files. Format:
+Generate complete, production-quality files. {SERVER_PORT_RULE} Format:
 
 ### FILENAME: filename.ext
 ```
@@ -65,6 +91,8 @@ Generate ALL necessary files including:
 - JavaScript files (if needed for interactivity)
 - README.md with setup instructions
 
+{SERVER_PORT_RULE}
+
 Format your response as:
 
 ### FILENAME: path/to/filename.ext
@@ -74,23 +102,137 @@ file content here
 
 Create a STUNNING, PROFESSIONAL project that rivals top portfolios. No explanations, only high-quality code."""
         
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=8000
-        )
-        
-        content = response.choices[0].message.content.strip()
-        self._parse_and_save_files(content)
+        if stream if stream is not None else self.stream:
+            self._stream_and_save_files(prompt, on_file)
+        else:
+            content = self.llm.complete(prompt, agent="coder", call="generate", **self.llm_params).strip()
+            with get_tracer().span("coder.write_files", kind="io"):
+                changes = self._parse_and_save_files(content)
+            print(f"   Files: {changes.summary()}")
         
         return self.code_file
     
+    def _generate_patch(self, requirement, feedback):
+        snapshot = get_snapshot(self.code_file)
+        current_code = ContextPacker(self.context_budget).pack(snapshot, hints=feedback)
+        
+        prompt = f"""You are an expert full-stack developer. Update this project based on feedback.
+
+REQUIREMENT: {requirement}
+
+CURRENT FILES:
+{current_code}
+
+FEEDBACK:
+{feedback}
+
+Return ONLY the files that need to change. Files you do not mention stay unchanged.
+{SERVER_PORT_RULE}
+For each changed file use either a complete replacement:
+
+### FILENAME: path/to/filename.ext
+```
+complete new file content
+```
+
+or a unified diff against the current file:
+
+### PATCH: path/to/filename.ext
+```diff
+@@ -12,3 +12,4 @@
+ unchanged line
+-removed line
++added line
+```
+
+No explanations, only changes."""
+        
+        content = self.llm.complete(prompt, agent="coder", call="patch", **self.llm_params).strip()
+        
+        changes = {}
+        try:
+            for kind, filename, code in parse_file_blocks(content):
+                # "./app.py" and "app.py" are the same file, in the snapshot and in this change set
+                filename = os.path.normpath(filename)
+                if kind == "patch":
+                    entry = snapshot.get(filename)
+                    if entry is None or entry.text is None:
+                        raise PatchError(f"Patch targets unknown file {filename}")
+                    code = apply_unified_diff(changes.get(filename, entry.text), code)
+                changes[filename] = code.strip()
+        except PatchError as e:
+            print(f"   ⚠️  {e}")
+            return False
+        if not changes:
+            # A prose-only reply changes nothing; regenerate instead of reporting a no-op as success
+            print("   ⚠️  Patch response contained no FILENAME or PATCH blocks")
+            return False
+        
+        with get_tracer().span("coder.write_files", kind="io", files=len(changes)):
+            self._commit(changes)
+        
+        # A full regeneration would have produced roughly the whole project again
+        full_tokens = estimate_tokens(snapshot.render())
+        patch_tokens = estimate_tokens(content)
+        self.last_patch_stats = {
+            "files_changed": len(changes),
+            "output_tokens": patch_tokens,
+            "tokens_saved": max(0, full_tokens - patch_tokens)
+        }
+        print(f"   ✂️  Patch mode: {self.last_changes.summary()}, ~{self.last_patch_stats['tokens_saved']} output tokens saved")
+        return True
+    
+    def _commit(self, files):
+        # Unchanged files are skipped; the snapshot is only rebuilt when something changed
+        self.last_changes = self.writer.commit(files)
+        if self.last_changes:
+            invalidate(self.code_file)
+        return self.last_changes
+    
+    def _stream_and_save_files(self, prompt, on_file=None):
+        start = time.time()
+        first_file_at = None
+        saved = 0
+        parser = FileBlockParser()
+        
+        def save(blocks):
+            nonlocal first_file_at, saved
+            for kind, filename, code in blocks:
+                if kind != "file":
+                    continue
+                filepath = self._save_file(filename, code)
+                if filepath is None:
+                    continue
+                saved += 1
+                if first_file_at is None:
+                    first_file_at = time.time() - start
+                    print(f"   ⏱️  First file ready after {first_file_at:.2f}s")
+                if on_file:
+                    on_file(filepath)
+        
+        for chunk in self.llm.stream(prompt, agent="coder", call="generate", **self.llm_params):
+            save(parser.feed(chunk))
+        save(parser.close())
+        
+        if not saved:
+            self._parse_and_save_files(parser.unparsed_text().strip())
+        
+        self.last_stream_stats = {
+            "time_to_first_file": first_file_at,
+            "total_time": time.time() - start,
+            "files": saved
+        }
+    
+    def _save_file(self, filename, code):
+        changes = self._commit({filename: code.strip()})
+        if changes.rejected:
+            return None
+        return os.path.join(self.code_file, (changes.changed or changes.unchanged)[0])
+    
     def _parse_and_save_files(self, content):
-        import re
-        pattern = r'### FILENAME: ([^\n]+)\n```(?:[a-z]*\n)?([\s\S]*?)```'
-        matches = re.findall(pattern, content)
+        files = {filename: code.strip() for kind, filename, code in parse_file_blocks(content) if kind == "file"}
         
-        if not matches:
+        if not files:
             if "<!DOCTYPE" in content or "<html" in content:
                 ext = "index.html"
             elif "def " in content or "import " in content:
@@ -100,14 +242,7 @@ Create a STUNNING, PROFESSIONAL project that rivals top portfolios. No explanati
             else:
                 ext = "output.txt"
             
-            main_file = os.path.join(self.code_file, ext)
             content = re.sub(r'```[a-z]*\n', '', content)
-            content = content.replace("```", "").strip()
-            with open(main_file, 'w') as f:
-                f.write(content)
-        else:
-            for filename, code in matches:
-                filepath = os.path.join(self.code_file, filename.strip())
-                os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else self.code_file, exist_ok=True)
-                with open(filepath, 'w') as f:
-                    f.write(code.strip())
+            files = {ext: content.replace("```", "").strip()}
+        
+        return self._commit(files)
@@ -0,0 +1,91 @@
+import os
+import re
+from llm_client import estimate_tokens
+
+ENTRY_POINTS = (
+    "index.html", "app.py", "main.py", "manage.py", "server.js", "index.js", "app.js",
+    "package.json", "requirements.txt"
+)
+KIND_ORDER = ("html", "css", "js", "python", "config", "json", "markdown", "text", "other", "image")
+
+def truncate_tokens(text, budget):
+    # Keep the head and the tail: pytest and stack traces put their summary at the end
+    if estimate_tokens(text) <= budget:
+        return text
+    keep = budget * 4 // 2
+    omitted = estimate_tokens(text[keep:-keep])
+    return f"{text[:keep]}\n... [{omitted} tokens omitted] ...\n{text[-keep:]}"
+
+def outline(entry):
+    text = entry.text or ""
+    if entry.kind == "python":
+        names = re.findall(r'^(?:def|class) (\w+)', text, re.MULTILINE)
+    elif entry.kind == "js":
+        names = re.findall(r'(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:\(|async|function))', text)
+        names = [a or b for a, b in names]
+    elif entry.kind == "css":
+        names = re.findall(r'^\s*([^{}\n@/][^{}\n]*?)\s*\{', text, re.MULTILINE)
+    elif entry.kind == "html":
+        names = re.findall(r'<title>([^<]*)</title>', text, re.IGNORECASE)
+    else:
+        names = []
+    unique = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    summary = ", ".join(unique[:8])
+    return summary[:120]
+
+class ContextPacker:
+    def __init__(self, budget):
+        self.budget = budget
+
+    def rank(self, snapshot, hints=""):
+        hints = hints or ""
+
+        def score(item):
+            index, entry = item
+            name = os.path.basename(entry.path)
+            if name in ENTRY_POINTS:
+                group = 0
+            elif entry.path in hints or name in hints:
+                group = 1
+            else:
+                group = 2
+            kind = KIND_ORDER.index(entry.kind) if entry.kind in KIND_ORDER else len(KIND_ORDER)
+            return (group, entry.path.count(os.sep), kind, entry.size, index)
+
+        return [entry for _, entry in sorted(enumerate(snapshot), key=score)]
+
+    def pack(self, snapshot, hints=""):
+        sections = []
+        omitted = []
+        used = 0
+        for entry in self.rank(snapshot, hints):
+            if entry.text is None:
+                omitted.append(entry)
+                continue
+            block = f"{entry.path}:\n{entry.text}\n"
+            cost = estimate_tokens(block)
+            if used + cost <= self.budget:
+                sections.append(block)
+                used += cost
+            elif not sections:
+                # Never send an empty context: cut the top-ranked file down to the budget
+                sections.append(truncate_tokens(block, self.budget - 50))
+                used = self.budget - 50
+            else:
+                omitted.append(entry)
+
+        if omitted:
+            lines = ["OTHER FILES (not shown):"]
+            for count, entry in enumerate(omitted):
+                line = f"- {entry.path} ({entry.kind}, {entry.size} bytes)"
+                details = outline(entry)
+                if details:
+                    line += f": {details}"
+                cost = estimate_tokens(line)
+                if used + cost > self.budget:
+                    lines.append(f"- ... and {len(omitted) - count} more files")
+                    break
+                lines.append(line)
+                used += cost
+            sections.append("\n".join(lines))
+        return "\n".join(sections)
@@ -1,20 +1,60 @@
 import os
+import socket
 import subprocess
 import time
 import signal
-from groq import Groq
+import urllib.error
+import urllib.request
+from artifact_store import ArtifactStore
+from artifact_writer import ArtifactWriter, parse_file_blocks
+from asset_optimizer import optimize_site
+from coder_agent import SERVER_PORT_RULE
+from context_packer import ContextPacker, truncate_tokens
+from error_localizer import ErrorLocalizer, localize
+from env_cache import EnvironmentCache
+from llm_client import get_client
+from log_pump import LogPump
+from load_tester import LoadConfig, LoadReport, discover_routes, run_load_test
+from patches import PatchError, apply_unified_diff
+from preview_server import get_preview_server
+from telemetry import get_tracer
+from workspace_snapshot import get_snapshot, invalidate
+
+# Static sites are served in-process by the preview server instead of a shell command
+STATIC_PREVIEW = "static preview"
 
 class DeploymentAgent:
-    def __init__(self, workspace):
+    context_budget = 2000
+    error_budget = 800
+    log_tail_lines = 60
+    ready_timeout = 30
+    
+    def __init__(self, workspace, port=5000, interactive=True, load_test=False):
         self.workspace = workspace
         self.output_dir = os.path.join(workspace, "output")
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self.llm = get_client()
         self.process = None
-        self.port = 5000
+        self.log_pump = None
+        self.log_file = os.path.join(workspace, "deploy.log")
+        self.preview = None
+        # Set to dist/ once the asset optimizer has built it; static sites are served from there
+        self.static_root = None
+        self.port = port
+        self.interactive = interactive
+        self.load_test_enabled = load_test
+        self.last_load_report = None
+        self.time_to_ready = None
+        self.env_cache = EnvironmentCache()
+        self.store = ArtifactStore.for_workspace(workspace)
         
     def deploy_and_test(self, requirement):
         print("\n🚀 DEPLOYMENT AGENT: Analyzing project structure...")
         
+        port = self._find_free_port(self.port)
+        if port != self.port:
+            print(f"   Port {self.port} is busy, using {port} instead")
+            self.port = port
+        
         # Detect project type and run command
         run_command = self._detect_run_command()
         
@@ -26,12 +66,13 @@ class DeploymentAgent:
         print(f"   Port: {self.port}")
         
         # Ask user permission
-        print(f"\n❓ Would you like to run the project locally on port {self.port}? (yes/no): ", end="")
-        response = input().strip().lower()
-        
-        if response not in ['yes', 'y']:
-            print("   Skipping deployment test")
-            return True
+        if self.interactive:
+            print(f"\n❓ Would you like to run the project locally on port {self.port}? (yes/no): ", end="")
+            response = input().strip().lower()
+            
+            if response not in ['yes', 'y']:
+                print("   Skipping deployment test")
+                return True
         
         # Try to run the project
         max_attempts = 3
@@ -41,11 +82,22 @@ class DeploymentAgent:
             success, error = self._run_project(run_command)
             
             if success:
-                print(f"\n✅ Project running successfully on port {self.port}!")
+                print(f"\n✅ Project running successfully on port {self.port}! (ready in {self.time_to_ready:.2f}s)")
+                if self.load_test_enabled:
+                    print(f"   {self._run_load_test().summary()}")
+                if not self.interactive:
+                    self._stop_project()
+                    return True
                 print(f"   Access it at: http://localhost:{self.port}")
+                if self.process:
+                    print(f"   Server log: {self.log_file}")
                 print("\n   Press Ctrl+C to stop the server...")
                 try:
-                    self.process.wait()
+                    if self.process:
+                        self.process.wait()
+                    else:
+                        while True:
+                            time.sleep(1)
                 except KeyboardInterrupt:
                     self._stop_project()
                     print("\n   Server stopped.")
@@ -77,14 +129,14 @@ class DeploymentAgent:
                         pkg = json.load(f)
                         # If no build script, treat as static
                         if 'scripts' not in pkg or 'build' not in pkg.get('scripts', {}):
-                            return f"cd {self.output_dir} && python3 -m http.server {self.port}"
+                            return STATIC_PREVIEW
                 except:
                     pass
                 # Has package.json with build - skip deployment
                 return None
             else:
                 # Pure static HTML
-                return f"cd {self.output_dir} && python3 -m http.server {self.port}"
+                return STATIC_PREVIEW
         
         # Python Flask/Django
         elif 'app.py' in files:
@@ -97,7 +149,7 @@ class DeploymentAgent:
             # Check if npm exists
             import shutil
             if shutil.which('npm'):
-                return f"cd {self.output_dir} && npm install && npm start"
+                return f"cd {self.output_dir} && npm start"
             else:
                 print("   ⚠️  Node.js project detected but npm not installed. Skipping deployment.")
                 return None
@@ -106,8 +158,11 @@ class DeploymentAgent:
     
     def _run_project(self, command):
         try:
+            if command == STATIC_PREVIEW:
+                return self._serve_static()
             # Install dependencies first
-            self._install_dependencies()
+            with get_tracer().span("deployer.install_dependencies", kind="subprocess"):
+                env = self._install_dependencies(command)
             
             # Run the project
             self.process = subprocess.Popen(
@@ -115,67 +170,168 @@ class DeploymentAgent:
                 shell=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                text=True,
+                errors="replace",
+                env=dict(env, PORT=str(self.port)),
+                # Own process group: _stop_project's killpg reaches the shell and its npm/node/flask
+                # children, without signalling the orchestrator
+                start_new_session=True
             )
+            # Keep both pipes drained for as long as the server runs
+            self.log_pump = LogPump(self.process, self.log_file, label=command)
             
-            # Wait a bit to see if it starts successfully
-            time.sleep(3)
-            
-            # Check if process is still running
-            if self.process.poll() is None:
-                return True, None
-            else:
-                _, stderr = self.process.communicate()
-                return False, stderr
+            with get_tracer().span("deployer.wait_until_ready", kind="subprocess", port=self.port) as span:
+                ready, error = self._wait_until_ready()
+                span.set(ready=ready, time_to_ready=self.time_to_ready)
+            if not ready:
+                self._stop_project()
+            return ready, error
                 
         except Exception as e:
+            self._stop_project()
             return False, str(e)
     
-    def _install_dependencies(self):
+    def load_test(self):
+        # Smoke deploy for review: start without prompts or auto-fix, measure, then stop
+        run_command = self._detect_run_command()
+        if not run_command:
+            return None
+        self.port = self._find_free_port(self.port)
+        try:
+            success, error = self._run_project(run_command)
+            if not success:
+                self.last_load_report = LoadReport(LoadConfig.from_env(), error=error or "server did not start")
+                return self.last_load_report
+            return self._run_load_test()
+        finally:
+            self._stop_project()
+    
+    def _run_load_test(self):
+        routes = discover_routes(get_snapshot(self.output_dir))
+        print(f"   📊 Load testing {len(routes)} route(s): {', '.join(routes)}")
+        with get_tracer().span("deployer.load_test", kind="io", port=self.port, routes=len(routes)) as span:
+            self.last_load_report = run_load_test(f"http://127.0.0.1:{self.port}", routes)
+            span.set(**self.last_load_report.metrics())
+        return self.last_load_report
+    
+    def _serve_static(self):
+        # Keep one mount across attempts: fixes written by _apply_fixes invalidate the
+        # snapshot, so the same server serves the new files without a restart
+        with get_tracer().span("deployer.preview", kind="io", port=self.port) as span:
+            if self.preview is None:
+                self.preview = get_preview_server().mount(self.static_root or self.output_dir, self.port)
+            else:
+                self.preview.reload()
+            ready, error = self._wait_until_ready()
+            span.set(ready=ready, time_to_ready=self.time_to_ready)
+        return ready, error
+    
+    def _find_free_port(self, preferred):
+        for port in (preferred, 0):
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                # Like a real server: TIME_WAIT leftovers of a previous preview or load test do not make a port busy
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                try:
+                    sock.bind(("127.0.0.1", port))
+                except OSError:
+                    continue
+                return sock.getsockname()[1]
+        return preferred
+    
+    def _wait_until_ready(self):
+        # Poll the HTTP endpoint with a short backoff instead of sleeping a fixed time
+        url = f"http://127.0.0.1:{self.port}/"
+        start = time.time()
+        delay = 0.05
+        self.time_to_ready = None
+        while time.time() - start < self.ready_timeout:
+            if self.process and self.process.poll() is not None:
+                self.log_pump.join()
+                return False, f"Process exited with code {self.process.returncode}:\n{self._log_tail()}"
+            
+            try:
+                with urllib.request.urlopen(url, timeout=2) as response:
+                    status = response.status
+                    body = ""
+            except urllib.error.HTTPError as e:
+                status = e.code
+                body = e.read(1000).decode("utf-8", errors="replace")
+            except (urllib.error.URLError, OSError):
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                continue
+            
+            self.time_to_ready = time.time() - start
+            if status >= 500:
+                return False, f"Server is running but GET / returned HTTP {status}:\n{body}{self._log_section()}"
+            return True, None
+        
+        return False, (f"Server did not respond on port {self.port} within {self.ready_timeout}s. "
+                       f"The app should listen on the port given in the PORT environment variable."
+                       f"{self._log_section()}")
+    
+    def _log_tail(self):
+        return self.log_pump.tail(self.log_tail_lines) if self.log_pump else ""
+    
+    def _log_section(self):
+        tail = self._log_tail()
+        return f"\n\nServer log (last lines):\n{tail}" if tail else ""
+    
+    def _install_dependencies(self, command):
+        # Environments are cached by a hash of the dependency files, so attempts, iterations
+        # and runs that keep the same dependencies skip the install entirely
         files = os.listdir(self.output_dir)
+        python_env = None
         
         # Python dependencies
         if 'requirements.txt' in files:
             print("   Installing Python dependencies...")
-            subprocess.run(
-                f"cd {self.output_dir} && pip install -r requirements.txt",
-                shell=True,
-                capture_output=True
-            )
+            python_env, reused = self.env_cache.python_env(self.output_dir)
+            if reused:
+                print("   ♻️  Reusing cached Python environment")
         
-        # Node.js dependencies
-        if 'package.json' in files:
+        # Node.js dependencies (static sites served without npm don't need them)
+        if 'package.json' in files and 'npm' in command:
             print("   Installing Node.js dependencies...")
-            subprocess.run(
-                f"cd {self.output_dir} && npm install",
-                shell=True,
-                capture_output=True
-            )
+            _, reused = self.env_cache.node_modules(self.output_dir)
+            if reused:
+                print("   ♻️  Reusing cached node_modules")
+        
+        return self.env_cache.environ(python_env=python_env)
     
     def _auto_fix_errors(self, error, requirement):
-        # Read all project files
-        files_content = []
-        for root, dirs, files in os.walk(self.output_dir):
-            for file in files:
-                filepath = os.path.join(root, file)
-                try:
-                    with open(filepath, 'r') as f:
-                        rel_path = os.path.relpath(filepath, self.output_dir)
-                        files_content.append(f"{rel_path}:\n{f.read()}\n")
-                except:
-                    pass
+        snapshot = get_snapshot(self.output_dir)
+        # Show the code the error points at; fall back to the whole project when it points nowhere
+        all_code, excerpted = ErrorLocalizer(self.context_budget).build_context(snapshot, error)
+        if all_code is None:
+            all_code = ContextPacker(self.context_budget).pack(snapshot, hints=error)
+        else:
+            print(f"   🎯 Localized error to: {', '.join(str(loc) for loc in localize(snapshot, error)[:5])}")
         
-        all_code = "\n".join(files_content)
+        patch_format = ""
+        if excerpted:
+            patch_format = f"""
+Files marked EXCERPT ({', '.join(excerpted)}) are only partially shown. Change them with a unified
+diff instead of a complete file:
+
+### PATCH: path/to/filename.ext
+```diff
+@@ -12,3 +12,4 @@
+ unchanged line
+-removed line
++added line
+```
+"""
         
         prompt = f"""Fix this project error.
 
 REQUIREMENT: {requirement}
 
 CURRENT CODE:
-{all_code[:2000]}
+{all_code}
 
 ERROR:
-{error}
+{truncate_tokens(error, self.error_budget)}
 
 Generate fixed files in this format:
 
@@ -183,34 +339,59 @@ Generate fixed files in this format:
 ```
 fixed code here
 ```
-
-Only include files that need changes. No explanations."""
+{patch_format}
+Only include files that need changes. {SERVER_PORT_RULE} No explanations."""
         
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=3000
-        )
-        
-        content = response.choices[0].message.content.strip()
+        # A cached fix for the same error would just be replayed on every attempt
+        content = self.llm.complete(prompt, agent="deployer", call="fix", use_cache=False).strip()
         self._apply_fixes(content)
         print("   ✅ Fixes applied")
     
     def _apply_fixes(self, content):
-        import re
-        pattern = r'### FILENAME: ([^\n]+)\n```(?:[a-z]*\n)?([\s\S]*?)```'
-        matches = re.findall(pattern, content)
-        
-        for filename, code in matches:
-            filepath = os.path.join(self.output_dir, filename.strip())
-            os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else self.output_dir, exist_ok=True)
-            with open(filepath, 'w') as f:
-                f.write(code.strip())
+        snapshot = get_snapshot(self.output_dir)
+        files = {}
+        for kind, filename, code in parse_file_blocks(content):
+            if kind == "patch":
+                entry = snapshot.get(os.path.normpath(filename))
+                try:
+                    if entry is None or entry.text is None:
+                        raise PatchError(f"Patch targets unknown file {filename}")
+                    code = apply_unified_diff(files.get(filename, entry.text), code)
+                except PatchError as e:
+                    print(f"   ⚠️  {e}")
+                    continue
+            files[filename] = code.strip()
+        changes = ArtifactWriter(self.output_dir).commit(files)
+        print(f"   Files: {changes.summary()}")
+        
+        if changes:
+            invalidate(self.output_dir)
+            manifest = self.store.snapshot(self.output_dir, "deploy fix")
+            print(f"   📦 Snapshot {manifest['id']}")
+            if self.static_root:
+                # Keep dist/ in step with the fixed sources
+                optimize_site(self.output_dir, self.static_root)
+                print(f"   🗜️  Rebuilt {self.static_root}")
+        return changes
     
     def _stop_project(self):
+        if self.preview:
+            get_preview_server().unmount(self.preview)
+            self.preview = None
         if self.process:
             try:
                 os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
             except:
                 self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
+                except OSError:
+                    self.process.kill()
+                self.process.wait()
             self.process = None
+        if self.log_pump:
+            self.log_pump.close()
+            self.log_pump = None
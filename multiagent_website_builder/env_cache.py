@@ -0,0 +1,154 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import venv
+from contextlib import contextmanager
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "multiagent_website_builder", "envs")
+READY_MARKER = ".ready.json"
+
+def _dir_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.lstat(os.path.join(root, file)).st_size
+            except OSError:
+                pass
+    return total
+
+class EnvironmentCache:
+    def __init__(self, root=None, max_bytes=None, max_age_days=None, find_links=None):
+        self.root = root or os.environ.get("DEPS_CACHE_DIR", DEFAULT_ROOT)
+        self.max_bytes = max_bytes or int(os.environ.get("DEPS_CACHE_MAX_MB", "5120")) * 1024 * 1024
+        self.max_age = (max_age_days or int(os.environ.get("DEPS_CACHE_MAX_AGE_DAYS", "30"))) * 86400
+        # Optional directory of local wheels/sdists to install from before hitting the index
+        self.find_links = find_links or os.environ.get("DEPS_FIND_LINKS")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _key(self, kind, paths):
+        digest = hashlib.sha256(kind.encode())
+        if kind == "py":
+            digest.update(f"{sys.executable}:{sys.version_info[:3]}".encode())
+        for path in paths:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return f"{kind}-{digest.hexdigest()[:16]}"
+
+    @contextmanager
+    def _locked(self, name):
+        # Batch workers may build the same environment at the same time
+        with open(os.path.join(self.root, f"{name}.lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _ready(self, env_dir):
+        marker = os.path.join(env_dir, READY_MARKER)
+        if os.path.exists(marker):
+            os.utime(marker)
+            return True
+        return False
+
+    def _mark_ready(self, env_dir):
+        with open(os.path.join(env_dir, READY_MARKER), 'w') as f:
+            json.dump({"created": time.time(), "size": _dir_size(env_dir)}, f)
+
+    def _run(self, command, cwd=None, env=None):
+        result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(command[:3])} failed:\n{(result.stdout + result.stderr)[-2000:]}")
+
+    def python_env(self, project_dir):
+        requirements = os.path.join(project_dir, "requirements.txt")
+        name = self._key("py", [requirements])
+        env_dir = os.path.join(self.root, name)
+        with self._locked(name):
+            if self._ready(env_dir):
+                return env_dir, True
+
+            shutil.rmtree(env_dir, ignore_errors=True)
+            venv.create(env_dir, with_pip=True)
+            command = [os.path.join(env_dir, "bin", "python"), "-m", "pip", "install", "-q",
+                       "--cache-dir", os.path.join(self.root, "pip-cache"), "-r", requirements]
+            if self.find_links:
+                command += ["--find-links", self.find_links]
+            try:
+                self._run(command, cwd=project_dir)
+            except RuntimeError:
+                shutil.rmtree(env_dir, ignore_errors=True)
+                raise
+            self._mark_ready(env_dir)
+        self.evict()
+        return env_dir, False
+
+    def node_modules(self, project_dir):
+        lockfile = os.path.join(project_dir, "package-lock.json")
+        manifests = [os.path.join(project_dir, "package.json")]
+        if os.path.exists(lockfile):
+            manifests.append(lockfile)
+        name = self._key("node", manifests)
+        env_dir = os.path.join(self.root, name)
+        with self._locked(name):
+            reused = self._ready(env_dir)
+            if not reused:
+                shutil.rmtree(env_dir, ignore_errors=True)
+                os.makedirs(env_dir)
+                for manifest in manifests:
+                    shutil.copy(manifest, env_dir)
+                command = ["npm", "ci" if len(manifests) > 1 else "install", "--no-audit", "--no-fund",
+                           "--prefer-offline", "--cache", os.path.join(self.root, "npm-cache")]
+                try:
+                    self._run(command, cwd=env_dir)
+                except RuntimeError:
+                    shutil.rmtree(env_dir, ignore_errors=True)
+                    raise
+                self._mark_ready(env_dir)
+
+        # Point the project at the cached modules instead of installing into it
+        link = os.path.join(project_dir, "node_modules")
+        target = os.path.join(env_dir, "node_modules")
+        if os.path.islink(link):
+            os.remove(link)
+        if not os.path.exists(link):
+            os.symlink(target, link)
+        if not reused:
+            self.evict()
+        return env_dir, reused
+
+    def environ(self, base=None, python_env=None):
+        env = dict(base if base is not None else os.environ)
+        if python_env:
+            env["VIRTUAL_ENV"] = python_env
+            env["PATH"] = os.path.join(python_env, "bin") + os.pathsep + env.get("PATH", "")
+        return env
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.root):
+            marker = os.path.join(self.root, name, READY_MARKER)
+            try:
+                with open(marker, 'r') as f:
+                    size = json.load(f).get("size", 0)
+                last_used = os.path.getmtime(marker)
+            except (OSError, ValueError):
+                continue
+            entries.append((last_used, size, name))
+
+        # Age limit first, then drop the least recently used environments until under the cap
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        for last_used, size, name in entries:
+            if now - last_used <= self.max_age and total <= self.max_bytes:
+                continue
+            with self._locked(name):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= size
@@ -0,0 +1,163 @@
+import os
+import re
+from context_packer import outline, truncate_tokens
+from llm_client import estimate_tokens
+
+PYTHON_FRAME = re.compile(r'File "([^"]+)", line (\d+)')
+NODE_FRAME = re.compile(r'\(?((?:file://)?[^\s()]+\.(?:js|mjs|cjs|jsx|ts|tsx)):(\d+)(?::\d+)?\)?')
+MISSING_PYTHON_MODULE = re.compile(r"No module named '([\w.]+)'")
+MISSING_NODE_MODULE = re.compile(r"Cannot find module '([^']+)'")
+PIP_REQUIREMENT = re.compile(r"(?:No matching distribution found for|satisfies the requirement) ([A-Za-z0-9_.\-]+)")
+NPM_ERROR = re.compile(r'^npm (?:ERR!|error)', re.MULTILINE)
+PYTHON_IMPORT = re.compile(r'^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))', re.MULTILINE)
+JS_IMPORT_LINE = re.compile(r'''require\(\s*['"]|^\s*import\s''')
+JS_IMPORT = re.compile(r'''(?:require\(\s*|from\s+|import\s+)['"](\.{1,2}/[^'"]+)['"]''')
+
+class ErrorLocation:
+    def __init__(self, path, line=None, reason=None):
+        self.path = path
+        self.line = line
+        self.reason = reason
+
+    def __str__(self):
+        return f"{self.path}:{self.line}" if self.line else self.path
+
+def _relative(snapshot, path):
+    path = path.replace("file://", "")
+    if os.path.isabs(path):
+        if not path.startswith(snapshot.root + os.sep):
+            # Library frames (site-packages, node internals) are not ours to fix
+            return None
+        path = os.path.relpath(path, snapshot.root)
+    path = os.path.normpath(path)
+    return path if snapshot.get(path) else None
+
+def _find_line(entry, name):
+    pattern = re.compile(rf'^\s*{re.escape(name)}\b', re.IGNORECASE)
+    for number, line in enumerate((entry.text or "").split("\n"), 1):
+        if pattern.match(line):
+            return number
+    return None
+
+def localize(snapshot, error):
+    locations = []
+
+    def add(path, line=None, reason=None):
+        rel = _relative(snapshot, path)
+        if rel and not any(loc.path == rel and loc.line == line for loc in locations):
+            locations.append(ErrorLocation(rel, line, reason))
+
+    # Python prints the innermost frame last, Node prints it first
+    for path, line in reversed(PYTHON_FRAME.findall(error)):
+        add(path, int(line), "traceback")
+    for path, line in NODE_FRAME.findall(error):
+        add(path, int(line), "stack trace")
+
+    for module in MISSING_PYTHON_MODULE.findall(error) + PIP_REQUIREMENT.findall(error):
+        name = module.split(".")[0]
+        requirements = snapshot.get("requirements.txt")
+        if requirements is not None:
+            add("requirements.txt", _find_line(requirements, name), f"dependency {name}")
+    for module in MISSING_NODE_MODULE.findall(error):
+        if not module.startswith("."):
+            add("package.json", None, f"dependency {module}")
+    if NPM_ERROR.search(error):
+        add("package.json", None, "npm error")
+
+    # Anything else the error mentions by name, e.g. "templates/index.html not found"
+    for entry in snapshot:
+        if entry.text is not None and entry.path in error and not any(loc.path == entry.path for loc in locations):
+            add(entry.path, None, "mentioned in error")
+    return locations
+
+def _imports(entry):
+    text = entry.text or ""
+    if entry.kind == "python":
+        lines = [(number, line) for number, line in enumerate(text.split("\n"), 1) if PYTHON_IMPORT.match(line)]
+        modules = [(a or b).split(".")[0] + ".py" for a, b in PYTHON_IMPORT.findall(text)]
+    elif entry.kind == "js":
+        lines = [(number, line) for number, line in enumerate(text.split("\n"), 1) if JS_IMPORT_LINE.search(line)]
+        modules = [os.path.normpath(os.path.join(os.path.dirname(entry.path), path)) for path in JS_IMPORT.findall(text)]
+        modules = [path if os.path.splitext(path)[1] else path + ".js" for path in modules]
+    else:
+        return [], []
+    return lines, modules
+
+class ErrorLocalizer:
+    def __init__(self, budget, window=12, whole_file_lines=80):
+        self.budget = budget
+        self.window = window
+        self.whole_file_lines = whole_file_lines
+
+    def build_context(self, snapshot, error):
+        # Returns (context, excerpted paths), or (None, []) when nothing in the error points at our files
+        locations = localize(snapshot, error)
+        if not locations:
+            return None, []
+
+        ranges = {}
+        for location in locations:
+            lines = snapshot.get(location.path).text.split("\n")
+            if location.line is None or len(lines) <= self.whole_file_lines:
+                span = (1, len(lines))
+            else:
+                span = (max(1, location.line - self.window), min(len(lines), location.line + self.window))
+            ranges.setdefault(location.path, []).append(span)
+
+        sections = []
+        excerpted = []
+        related = []
+        used = 0
+        for path, spans in ranges.items():
+            entry = snapshot.get(path)
+            lines = entry.text.split("\n")
+            merged = []
+            for start, end in sorted(spans):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            markers = ", ".join(f"line {loc.line}" if loc.line else loc.reason for loc in locations if loc.path == path)
+
+            excerpt_header = f"{path} (EXCERPT of {len(lines)} lines, error at {markers}):"
+            if merged == [(1, len(lines))]:
+                block = f"{path} (complete file, error at {markers}):\n{entry.text}\n"
+            else:
+                excerpted.append(path)
+                # Imports outside the windows, so the fixer knows what names are available
+                import_lines = [line for number, line in _imports(entry)[0]
+                                if not any(start <= number <= end for start, end in merged)]
+                parts = [excerpt_header]
+                if import_lines:
+                    parts.append("@@ imports @@\n" + "\n".join(import_lines))
+                for start, end in merged:
+                    parts.append(f"@@ lines {start}-{end} @@\n" + "\n".join(lines[start - 1:end]))
+                block = "\n".join(parts) + "\n"
+
+            cost = estimate_tokens(block)
+            if used + cost > self.budget:
+                if sections:
+                    break
+                if path not in excerpted:
+                    # A truncated "complete file" would be taken as the whole file and replaced with it
+                    excerpted.append(path)
+                    block = f"{excerpt_header}\n{entry.text}\n"
+                block = truncate_tokens(block, self.budget)
+                cost = self.budget
+            sections.append(block)
+            used += cost
+            related += [module for module in _imports(entry)[1] if module not in ranges and module not in related]
+
+        lines = []
+        for module in related:
+            module_entry = snapshot.get(module)
+            if module_entry is None:
+                continue
+            line = f"- {module} ({module_entry.kind}, {module_entry.size} bytes): {outline(module_entry)}"
+            if used + estimate_tokens(line) > self.budget:
+                break
+            lines.append(line)
+            used += estimate_tokens(line)
+        if lines:
+            sections.append("IMPORTED FILES (not shown):\n" + "\n".join(lines))
+        return "\n".join(sections), excerpted
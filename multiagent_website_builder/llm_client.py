@@ -0,0 +1,381 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from llm_cache import ResponseCache
+from model_router import ModelRouter
+from rate_limiter import RequestScheduler
+from telemetry import get_tracer
+
+# Groq's on-demand tokens-per-minute quota for llama-3.3-70b-versatile, per model
+DEFAULT_TPM = 12000
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text and code
+    return (len(text) + 3) // 4
+
+
+class Completion:
+    def __init__(self, content, model, usage=None):
+        self.content = content
+        self.model = model
+        self.usage = usage or {}
+
+
+class GroqBackend:
+    name = "groq"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        # Import lazily and build a single client: it owns one keep-alive connection pool
+        # that every agent shares.
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from groq import Groq
+                    # Retries are handled by the RequestScheduler, not by the SDK
+                    self._client = Groq(api_key=os.environ.get("GROQ_API_KEY"), max_retries=0)
+        return self._client
+
+    def complete(self, model, messages, agent=None, **params):
+        response = self._get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            **params
+        )
+        usage = {}
+        if getattr(response, "usage", None) is not None:
+            usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens
+            }
+        return Completion(response.choices[0].message.content, model, usage)
+
+    def stream(self, model, messages, agent=None, **params):
+        chunks = self._get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def _split_chunks(text, size=64):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+STUB_RESPONSES = {
+    "coder": """### FILENAME: index.html
+```html
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Stub Site</title>
+    <link rel="stylesheet" href="style.css">
+</head>
+<body>
+    <main>
+        <h1>Stub Site</h1>
+        <p>Generated offline by the stub LLM backend.</p>
+    </main>
+</body>
+</html>
+```
+
+### FILENAME: style.css
+```css
+body {
+    font-family: system-ui, sans-serif;
+    margin: 0 auto;
+    max-width: 40rem;
+}
+```""",
+    "tester": """def test_stub():
+    assert True""",
+    "user": "No critical issues found",
+    "manager": "APPROVED",
+    "deployer": ""
+}
+
+
+class StubBackend:
+    name = "stub"
+
+    def __init__(self, responses=None):
+        self.responses = responses or STUB_RESPONSES
+
+    def complete(self, model, messages, agent=None, **params):
+        return Completion(self.responses.get(agent, ""), model)
+
+    def stream(self, model, messages, agent=None, **params):
+        yield from _split_chunks(self.complete(model, messages, agent=agent, **params).content)
+
+
+class ReplayBackend:
+    name = "replay"
+
+    def __init__(self, path):
+        # Recordings map an agent name to the responses it produced, in call order.
+        # The last response of an agent is repeated once its recordings run out.
+        with open(path, 'r') as f:
+            self.recordings = json.load(f)
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def complete(self, model, messages, agent=None, **params):
+        responses = self.recordings.get(agent) or [""]
+        with self._lock:
+            index = self._positions.get(agent, 0)
+            self._positions[agent] = index + 1
+        return Completion(responses[min(index, len(responses) - 1)], model)
+
+    def stream(self, model, messages, agent=None, **params):
+        yield from _split_chunks(self.complete(model, messages, agent=agent, **params).content)
+
+
+class RecordingBackend:
+    def __init__(self, backend, path):
+        self.backend = backend
+        self.name = backend.name
+        self.path = path
+        self.recordings = {}
+        self._lock = threading.Lock()
+
+    def complete(self, model, messages, agent=None, **params):
+        completion = self.backend.complete(model, messages, agent=agent, **params)
+        self._record(agent, completion.content)
+        return completion
+
+    def stream(self, model, messages, agent=None, **params):
+        parts = []
+        for chunk in self.backend.stream(model, messages, agent=agent, **params):
+            parts.append(chunk)
+            yield chunk
+        self._record(agent, "".join(parts))
+
+    def _record(self, agent, content):
+        with self._lock:
+            self.recordings.setdefault(agent, []).append(content)
+            with open(self.path, 'w') as f:
+                json.dump(self.recordings, f, indent=2)
+
+
+class LLMClient:
+    def __init__(self, backend, model=None, cache=None, scheduler=None, router=None):
+        self.backend = backend
+        # A fixed model pins every call to it; otherwise the router picks one per agent and call type
+        self.model = model
+        self.cache = cache
+        self.scheduler = scheduler
+        self.router = router or ModelRouter.load()
+
+    def _schedule(self, call, prompt, max_tokens, model):
+        if self.scheduler is None:
+            return call()
+        return self.scheduler.run(call, estimated_tokens=estimate_tokens(prompt) + max_tokens, model=model)
+
+    def _plan(self, agent, call, model, max_tokens, params):
+        route = self.router.route(agent, call)
+        model = model or self.model
+        models = [model] if model else self.router.candidates(route)
+        params["max_tokens"] = max_tokens or route["max_tokens"]
+        options = {"timeout": route["timeout_s"]} if route.get("timeout_s") else {}
+        # The cache is keyed by the configured primary model, whichever model ends up serving
+        return models, model or route["models"][0], options
+
+    def _timed(self, model, call):
+        start = time.time()
+        try:
+            result = call()
+        except Exception:
+            self.router.record(model, time.time() - start, ok=False)
+            raise
+        self.router.record(model, time.time() - start, ok=True)
+        return result
+
+    def _with_fallback(self, models, request, prompt, max_tokens):
+        for index, model in enumerate(models):
+            try:
+                return model, self._schedule(lambda: self._timed(model, lambda: request(model)), prompt, max_tokens,
+                                             model)
+            except Exception as e:
+                if index == len(models) - 1:
+                    raise
+                print(f"   ⚠️  {model} failed ({type(e).__name__}), falling back to {models[index + 1]}")
+
+    def complete(self, prompt, max_tokens=None, agent=None, call=None, model=None, use_cache=True, **params):
+        models, primary, options = self._plan(agent, call, model, max_tokens, params)
+        messages = [{"role": "user", "content": prompt}]
+        max_tokens = params["max_tokens"]
+
+        key = None
+        if self.cache and use_cache:
+            key = self.cache.key(self.backend.name, primary, messages, params)
+            entry = self.cache.get(key)
+            if entry is not None:
+                get_tracer().record_llm(agent, entry.get("model", primary), 0.0, 0, 0, cached=True, call=call)
+                return entry["content"]
+
+        start = time.time()
+        served, completion = self._with_fallback(
+            models,
+            lambda model: self.backend.complete(model, messages, agent=agent, **params, **options),
+            prompt,
+            max_tokens
+        )
+        content = completion.content or ""
+        self._record(agent, call, completion.model, served != primary, time.time() - start, prompt, content,
+                     completion.usage)
+        if key is not None:
+            self.cache.put(key, {"content": content, "model": completion.model, "usage": completion.usage})
+        return content
+
+    def stream(self, prompt, max_tokens=None, agent=None, call=None, model=None, use_cache=True, **params):
+        models, primary, options = self._plan(agent, call, model, max_tokens, params)
+        messages = [{"role": "user", "content": prompt}]
+        max_tokens = params["max_tokens"]
+
+        key = None
+        if self.cache and use_cache:
+            key = self.cache.key(self.backend.name, primary, messages, params)
+            entry = self.cache.get(key)
+            if entry is not None:
+                get_tracer().record_llm(agent, entry.get("model", primary), 0.0, 0, 0, cached=True, call=call)
+                yield entry["content"]
+                return
+
+        start = time.time()
+
+        def start_stream(model):
+            # Only the request itself can be retried: wait for the first chunk under the scheduler
+            chunks = iter(self.backend.stream(model, messages, agent=agent, **params, **options))
+            return chunks, next(chunks, None)
+
+        served, (chunks, first) = self._with_fallback(models, start_stream, prompt, max_tokens)
+        if first is None:
+            return
+
+        parts = []
+        completion_chars = 0
+        for chunk in itertools.chain([first], chunks):
+            completion_chars += len(chunk)
+            if key is not None:
+                parts.append(chunk)
+            yield chunk
+        self._record(agent, call, served, served != primary, time.time() - start, prompt, "", {
+            "completion_tokens": (completion_chars + 3) // 4
+        })
+        if key is not None:
+            self.cache.put(key, {"content": "".join(parts), "model": served, "usage": {}})
+
+    async def acomplete(self, prompt, max_tokens=None, agent=None, call=None, model=None, use_cache=True,
+                        **params):
+        return await asyncio.to_thread(
+            self.complete, prompt, max_tokens=max_tokens, agent=agent, call=call, model=model,
+            use_cache=use_cache, **params
+        )
+
+    def _record(self, agent, call, model, fallback, latency, prompt, content, usage):
+        # Prefer the token counts reported by the API, estimate when the backend has none
+        get_tracer().record_llm(
+            agent,
+            model,
+            latency,
+            usage.get("prompt_tokens") or estimate_tokens(prompt),
+            usage.get("completion_tokens") or estimate_tokens(content),
+            call=call,
+            fallback=fallback
+        )
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else {"hits": 0, "misses": 0, "bytes": 0}
+
+    def scheduler_stats(self):
+        return self.scheduler.stats() if self.scheduler else None
+
+    def model_stats(self):
+        return self.router.stats()
+
+
+def create_backend(name=None):
+    name = name or os.environ.get("LLM_BACKEND", "groq")
+    if name == "groq":
+        backend = GroqBackend()
+    elif name == "stub":
+        backend = StubBackend()
+    elif name == "replay":
+        backend = ReplayBackend(os.environ["LLM_REPLAY_FILE"])
+    else:
+        raise ValueError(f"Unknown LLM backend: {name}")
+
+    record_file = os.environ.get("LLM_RECORD_FILE")
+    if record_file:
+        backend = RecordingBackend(backend, record_file)
+    return backend
+
+
+def create_cache():
+    if os.environ.get("LLM_CACHE", "1") == "0":
+        return None
+    directory = os.environ.get(
+        "LLM_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache")
+    )
+    max_mb = int(os.environ.get("LLM_CACHE_MAX_MB", "256"))
+    return ResponseCache(directory, max_bytes=max_mb * 1024 * 1024)
+
+
+def create_scheduler(backend, router):
+    # Offline backends are not throttled unless limits are set explicitly
+    if backend.name != "groq" and "LLM_RPM" not in os.environ:
+        return None
+    # Processes that split one provider quota (batch workers) each get their share of it
+    share = max(1, int(os.environ.get("LLM_RATE_SHARE", "1")))
+    requests_per_minute = int(os.environ.get("LLM_RPM", "30"))
+    # By default each share fits the largest route twice over (prompt plus max_tokens), so no
+    # single call drains it; the provider's own 429s are still retried by the scheduler
+    largest = max(route.get("max_tokens", 0) for route in router.routes.values())
+    tokens_per_minute = int(os.environ.get("LLM_TPM", str(max(DEFAULT_TPM, 2 * largest * share))))
+    return RequestScheduler(
+        requests_per_minute=max(1, requests_per_minute // share) if requests_per_minute else None,
+        tokens_per_minute=max(1, tokens_per_minute // share) if tokens_per_minute else None,
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", "5"))
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                backend = create_backend()
+                router = ModelRouter.load()
+                _client = LLMClient(
+                    backend,
+                    os.environ.get("LLM_MODEL"),
+                    create_cache(),
+                    create_scheduler(backend, router),
+                    router
+                )
+    return _client
+
+
+def set_client(client):
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,206 @@
+import asyncio
+import math
+import os
+import re
+import time
+import urllib.parse
+
+FLASK_ROUTE = re.compile(r'''@\w+\.(route|get|post|put|patch|delete)\(\s*['"]([^'"]+)['"]([^)]*)\)''')
+EXPRESS_ROUTE = re.compile(r'''\b(?:app|router)\.(?:get|all)\(\s*['"`]([^'"`]+)['"`]''')
+DJANGO_ROUTE = re.compile(r'''\b(?:re_)?path\(\s*r?['"]([^'"]*)['"]''')
+MAX_ROUTES = 20
+
+def discover_routes(snapshot):
+    routes = []
+    for entry in snapshot:
+        if entry.text is None:
+            continue
+        found = []
+        if entry.kind == "python":
+            for verb, path, rest in FLASK_ROUTE.findall(entry.text):
+                # Only GET routes: a POST-only view answers 405 to the load test
+                if verb == "get" or (verb == "route" and ("methods" not in rest or "GET" in rest)):
+                    found.append(path)
+            if os.path.basename(entry.path) == "urls.py":
+                found += ["/" + path for path in DJANGO_ROUTE.findall(entry.text)]
+        elif entry.kind == "js" and "node_modules" not in entry.path:
+            found += EXPRESS_ROUTE.findall(entry.text)
+        elif entry.kind == "html" and snapshot.is_static:
+            path = "/" + entry.path.replace(os.sep, "/")
+            found.append(path[:-len("index.html")] if path.endswith("/index.html") else path)
+        # Parameterized routes need real ids; skip them rather than count 404s as errors
+        routes += [path for path in found if path.startswith("/") and not re.search(r'[<:{*(]', path)]
+    # Probe "/" only when nothing else was found: an API-only app may not serve it, and its 404s
+    # would count as errors
+    return list(dict.fromkeys(routes))[:MAX_ROUTES] or ["/"]
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered), math.ceil(fraction * len(ordered))) - 1)]
+
+class LoadConfig:
+    def __init__(self, concurrency=10, duration_s=5.0, timeout_s=5.0, max_p95_ms=500.0, max_error_rate=0.01,
+                 min_rps=None):
+        self.concurrency = concurrency
+        self.duration_s = duration_s
+        self.timeout_s = timeout_s
+        self.max_p95_ms = max_p95_ms
+        self.max_error_rate = max_error_rate
+        self.min_rps = min_rps
+
+    @classmethod
+    def from_env(cls):
+        min_rps = os.environ.get("LOADTEST_MIN_RPS")
+        return cls(
+            concurrency=int(os.environ.get("LOADTEST_CONCURRENCY", "10")),
+            duration_s=float(os.environ.get("LOADTEST_DURATION_S", "5")),
+            timeout_s=float(os.environ.get("LOADTEST_TIMEOUT_S", "5")),
+            max_p95_ms=float(os.environ.get("LOADTEST_MAX_P95_MS", "500")),
+            max_error_rate=float(os.environ.get("LOADTEST_MAX_ERROR_RATE", "0.01")),
+            min_rps=float(min_rps) if min_rps else None
+        )
+
+class LoadReport:
+    def __init__(self, config, samples=None, duration=0.0, error=None):
+        # samples: (route, status or None, latency in seconds)
+        self.config = config
+        self.samples = samples or []
+        self.duration = duration
+        self.error = error
+
+    @property
+    def requests(self):
+        return len(self.samples)
+
+    @property
+    def errors(self):
+        return sum(1 for _, status, _ in self.samples if status is None or status >= 400)
+
+    @property
+    def error_rate(self):
+        return self.errors / self.requests if self.requests else 1.0
+
+    @property
+    def rps(self):
+        return self.requests / self.duration if self.duration else 0.0
+
+    def latency_ms(self, fraction, route=None):
+        value = percentile([latency for path, _, latency in self.samples if route in (None, path)], fraction)
+        return value * 1000 if value is not None else None
+
+    def violations(self):
+        if self.error:
+            reason = self.error.strip().splitlines()[-1] if self.error.strip() else "unknown error"
+            return [f"server could not be started: {reason}"]
+        if not self.requests:
+            return ["no requests completed"]
+        problems = []
+        p95 = self.latency_ms(0.95)
+        if p95 > self.config.max_p95_ms:
+            problems.append(f"p95 latency {p95:.0f}ms > {self.config.max_p95_ms:.0f}ms")
+        if self.error_rate > self.config.max_error_rate:
+            problems.append(f"error rate {self.error_rate:.1%} > {self.config.max_error_rate:.1%}")
+        if self.config.min_rps and self.rps < self.config.min_rps:
+            problems.append(f"throughput {self.rps:.0f} req/s < {self.config.min_rps:.0f} req/s")
+        return problems
+
+    @property
+    def passed(self):
+        return not self.violations()
+
+    def metrics(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.rps, 1),
+            "p50_ms": self.latency_ms(0.50),
+            "p95_ms": self.latency_ms(0.95),
+            "p99_ms": self.latency_ms(0.99),
+            "passed": self.passed
+        }
+
+    def summary(self):
+        if self.error or not self.requests:
+            return "FAILED: " + "; ".join(self.violations())
+        lines = [
+            f"{'PASSED' if self.passed else 'FAILED'}: {self.requests} requests in {self.duration:.1f}s at "
+            f"concurrency {self.config.concurrency}, {self.rps:.0f} req/s, {self.error_rate:.1%} errors, "
+            f"p50 {self.latency_ms(0.5):.1f}ms, p95 {self.latency_ms(0.95):.1f}ms, p99 {self.latency_ms(0.99):.1f}ms"
+        ]
+        lines += [f"- {problem}" for problem in self.violations()]
+        for route in dict.fromkeys(path for path, _, _ in self.samples):
+            statuses = sorted({str(status) for path, status, _ in self.samples if path == route})
+            lines.append(f"- GET {route}: p95 {self.latency_ms(0.95, route):.1f}ms, status {'/'.join(statuses)}")
+        return "\n".join(lines)
+
+async def _request(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n"
+                 f"User-Agent: multiagent-load-tester\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by server")
+    version, status = status_line.decode("latin-1").split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        keep_alive = False
+    return int(status), keep_alive
+
+async def _worker(host, port, routes, offset, deadline, config, samples, max_requests=None):
+    connection = None
+    index = offset
+    while time.perf_counter() < deadline and (max_requests is None or index - offset < max_requests):
+        route = routes[index % len(routes)]
+        index += 1
+        start = time.perf_counter()
+        status = None
+        keep_alive = False
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(asyncio.open_connection(host, port), config.timeout_s)
+            status, keep_alive = await asyncio.wait_for(_request(*connection, host, route), config.timeout_s)
+        except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        samples.append((route, status, time.perf_counter() - start))
+        if not keep_alive and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+async def _load_test(base_url, routes, config):
+    url = urllib.parse.urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    # One untimed request per route warms up lazy imports, template compilation and caches
+    await _worker(host, port, routes, 0, time.perf_counter() + config.timeout_s, config, [], max_requests=len(routes))
+    samples = []
+    start = time.perf_counter()
+    deadline = start + config.duration_s
+    await asyncio.gather(*(
+        _worker(host, port, routes, offset, deadline, config, samples) for offset in range(config.concurrency)
+    ))
+    return samples, time.perf_counter() - start
+
+def run_load_test(base_url, routes, config=None):
+    config = config or LoadConfig.from_env()
+    samples, duration = asyncio.run(_load_test(base_url, routes or ["/"], config))
+    return LoadReport(config, samples, duration)
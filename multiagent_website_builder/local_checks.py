@@ -0,0 +1,173 @@
+import json
+import os
+import posixpath
+import time
+from html.parser import HTMLParser
+from telemetry import get_tracer
+from workspace_snapshot import get_snapshot
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source",
+             "track", "wbr"}
+EXTERNAL_PREFIXES = ("http://", "https://", "//", "data:", "mailto:", "tel:", "javascript:", "#")
+# Backend apps usually serve assets from one of these directories
+ASSET_DIRS = ("", "static", "public")
+
+class Issue:
+    def __init__(self, severity, path, message, line=None):
+        self.severity = severity
+        self.path = path
+        self.message = message
+        self.line = line
+
+    def __str__(self):
+        location = f"{self.path}:{self.line}" if self.line else self.path
+        return f"{location}: {self.message}"
+
+class CheckReport:
+    def __init__(self, issues=None, duration=0.0):
+        self.issues = issues or []
+        self.duration = duration
+
+    @property
+    def failures(self):
+        return [issue for issue in self.issues if issue.severity == "error"]
+
+    @property
+    def warnings(self):
+        return [issue for issue in self.issues if issue.severity == "warning"]
+
+    @property
+    def ok(self):
+        return not self.failures
+
+    def summary(self):
+        return (f"{len(self.failures)} error(s), {len(self.warnings)} warning(s) "
+                f"in {self.duration * 1000:.0f}ms")
+
+    def feedback(self):
+        # Structured feedback for the coder, used in place of the user and manager review
+        lines = ["Local checks found problems that must be fixed:"]
+        lines += [f"- ERROR {issue}" for issue in self.failures]
+        lines += [f"- WARNING {issue}" for issue in self.warnings]
+        return "\n".join(lines)
+
+class _AssetCollector(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.assets = []
+        self.tags = 0
+        self.stack = []
+        self.mismatched = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tags += 1
+        attrs = dict(attrs)
+        line = self.getpos()[0]
+        if tag == "link" and "stylesheet" in (attrs.get("rel") or "").lower() and attrs.get("href"):
+            self.assets.append((attrs["href"], line))
+        elif tag in ("script", "img", "source", "iframe") and attrs.get("src"):
+            self.assets.append((attrs["src"], line))
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, line))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                del self.stack[index:]
+                return
+        self.mismatched.append((tag, self.getpos()[0]))
+
+def _is_local(url):
+    url = url.strip()
+    return url and not url.lower().startswith(EXTERNAL_PREFIXES) and "{{" not in url and "{%" not in url
+
+def _resolve(snapshot, html_path, url):
+    target = url.split("#")[0].split("?")[0]
+    if target.startswith("/"):
+        candidates = [posixpath.join(base, target.lstrip("/")) for base in ASSET_DIRS]
+    else:
+        candidates = [posixpath.join(posixpath.dirname(html_path), target)]
+        candidates += [posixpath.join(base, target) for base in ASSET_DIRS if base]
+    return any(snapshot.get(os.path.normpath(candidate)) for candidate in candidates)
+
+def check_html(snapshot, entry, issues):
+    parser = _AssetCollector()
+    try:
+        parser.feed(entry.text)
+        parser.close()
+    except Exception as e:
+        issues.append(Issue("error", entry.path, f"HTML does not parse: {e}"))
+        return
+    if not parser.tags:
+        issues.append(Issue("error", entry.path, "no HTML tags found"))
+        return
+    for tag, line in parser.stack:
+        # An unclosed script or style swallows the rest of the page
+        if tag in ("script", "style"):
+            issues.append(Issue("error", entry.path, f"<{tag}> is never closed", line))
+        elif tag in ("html", "head", "body"):
+            issues.append(Issue("warning", entry.path, f"<{tag}> is never closed", line))
+    for tag, line in parser.mismatched:
+        issues.append(Issue("warning", entry.path, f"closing </{tag}> without a matching opening tag", line))
+    # Missing assets are fatal for static sites; backends may generate or route them
+    severity = "error" if snapshot.is_static else "warning"
+    for url, line in parser.assets:
+        if _is_local(url) and not _resolve(snapshot, entry.path.replace(os.sep, "/"), url):
+            issues.append(Issue(severity, entry.path, f"referenced file {url!r} does not exist", line))
+
+def check_python(entry, issues):
+    try:
+        compile(entry.text, entry.path, "exec")
+    except SyntaxError as e:
+        issues.append(Issue("error", entry.path, f"SyntaxError: {e.msg}", e.lineno))
+
+def check_json(entry, issues):
+    try:
+        data = json.loads(entry.text)
+    except ValueError as e:
+        issues.append(Issue("error", entry.path, f"invalid JSON: {e}"))
+        return
+    if entry.path != "package.json":
+        return
+    if not isinstance(data, dict):
+        issues.append(Issue("error", entry.path, "package.json must be a JSON object"))
+        return
+    scripts = data.get("scripts") or {}
+    if not isinstance(scripts, dict):
+        issues.append(Issue("error", entry.path, "\"scripts\" must be an object"))
+        return
+    if not scripts.get("start") and not data.get("main"):
+        issues.append(Issue("warning", entry.path, "no \"start\" script, `npm start` will fail"))
+
+def run_checks(code_dir):
+    start = time.perf_counter()
+    snapshot = get_snapshot(code_dir)
+    issues = []
+    with get_tracer().span("local_checks", kind="io", files=len(snapshot)) as span:
+        if not len(snapshot):
+            issues.append(Issue("error", "output/", "no files were generated"))
+        elif snapshot.paths() == ["output.txt"]:
+            issues.append(Issue("error", "output.txt", "no \"### FILENAME:\" blocks found, the response was saved "
+                                                       "as plain text"))
+        for entry in snapshot:
+            if entry.kind in ("html", "python", "js", "css", "json") and not entry.size:
+                issues.append(Issue("error", entry.path, "file is empty"))
+                continue
+            if entry.text is None:
+                continue
+            if entry.kind == "html":
+                check_html(snapshot, entry, issues)
+            elif entry.kind == "python":
+                check_python(entry, issues)
+            elif entry.kind == "json" or entry.path == "package.json":
+                check_json(entry, issues)
+        report = CheckReport(issues, time.perf_counter() - start)
+        span.set(errors=len(report.failures), warnings=len(report.warnings))
+    return report
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import deque
+
+class LogPump:
+    # Drains a process's stdout and stderr on background threads so a chatty server can
+    # never block on a full pipe. Only the last max_lines lines are kept in memory; the
+    # full output is streamed to log_path when one is given.
+    def __init__(self, process, log_path=None, max_lines=500, label=None):
+        self.process = process
+        self.lines = deque(maxlen=max_lines)
+        self.stderr = deque(maxlen=max_lines)
+        self.total_lines = 0
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', encoding="utf-8") if log_path else None
+        if self._log and label:
+            self._log.write(f"\n===== {time.strftime('%Y-%m-%d %H:%M:%S')} {label} =====\n")
+            self._log.flush()
+        self._threads = [
+            threading.Thread(target=self._pump, args=(stream, name), name=f"log-pump-{name}", daemon=True)
+            for stream, name in ((process.stdout, "stdout"), (process.stderr, "stderr")) if stream is not None
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _pump(self, stream, name):
+        try:
+            for line in iter(stream.readline, ""):
+                line = line.rstrip("\n")
+                with self._lock:
+                    self.lines.append(line)
+                    if name == "stderr":
+                        self.stderr.append(line)
+                    self.total_lines += 1
+                    if self._log:
+                        self._log.write(f"[{name}] {line}\n")
+                        self._log.flush()
+        except (OSError, ValueError):
+            # The stream was closed under us while stopping the process
+            pass
+
+    def tail(self, lines=60, stderr_only=False):
+        with self._lock:
+            buffer = list(self.stderr if stderr_only else self.lines)
+        return "\n".join(buffer[-lines:])
+
+    def join(self, timeout=2):
+        # Wait for the pipes to hit EOF (the process exited) so the tail is complete
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.time()))
+
+    def close(self):
+        self.join()
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
@@ -1,23 +1,33 @@
 import os
-from groq import Groq
+from context_packer import ContextPacker, truncate_tokens
+from llm_client import get_client
+from workspace_snapshot import get_snapshot
 
 class ManagerAgent:
+    context_budget = 3000
+    test_results_budget = 300
+    
     def __init__(self, workspace):
         self.workspace = workspace
         self.decision_file = os.path.join(workspace, "manager_decision.txt")
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self.llm = get_client()
         
-    def review(self, requirement, code_file, test_results, user_feedback):
-        files = []
-        for root, dirs, filenames in os.walk(code_file):
-            for filename in filenames:
-                filepath = os.path.join(root, filename)
-                with open(filepath, 'r') as f:
-                    files.append(f"{filename}:\n{f.read()}\n")
+    def review(self, requirement, code_file, test_results, user_feedback, load_results=None):
+        snapshot = get_snapshot(code_file)
+        # Files named in the feedback or in test failures are ranked right after entry points
+        all_code = ContextPacker(self.context_budget).pack(snapshot, hints=f"{user_feedback}\n{test_results}")
         
-        all_code = "\n".join(files)[:2000]
+        is_static = snapshot.is_static
         
-        is_static = 'index.html' in all_code and '.py' not in all_code and 'package.json' not in all_code
+        # Measured performance from the smoke deploy, when one was run
+        load_section = ""
+        load_rule = ""
+        if load_results:
+            load_section = f"""
+LOAD TEST (thresholds are enforced, a FAILED load test must be rejected):
+{load_results}
+"""
+            load_rule = "\n- Load test PASSED"
         
         if is_static:
             prompt = f"""Review this static website as a senior design/engineering lead.
@@ -29,7 +39,7 @@ CODE:
 
 USER FEEDBACK:
 {user_feedback}
-
+{load_section}
 APPROVE ONLY IF:
 - Design is modern, professional, visually appealing
 - Fully responsive (mobile, tablet, desktop)
@@ -38,7 +48,7 @@ APPROVE ONLY IF:
 - Smooth animations/transitions
 - Excellent user experience
 - Accessible (ARIA, alt text)
-- All feedback issues resolved
+- All feedback issues resolved{load_rule}
 
 Be STRICT - this should be portfolio-quality work.
 
@@ -56,11 +66,11 @@ CODE:
 {all_code}
 
 TEST RESULTS:
-{test_results[:500]}
+{truncate_tokens(test_results, self.test_results_budget)}
 
 USER FEEDBACK:
 {user_feedback}
-
+{load_section}
 APPROVE ONLY IF:
 - Production-ready, well-architected
 - All tests pass
@@ -68,7 +78,7 @@ APPROVE ONLY IF:
 - No hardcoded secrets
 - Excellent error handling
 - Clean, maintainable code
-- All feedback resolved
+- All feedback resolved{load_rule}
 
 Be STRICT - enterprise-grade quality required.
 
@@ -78,13 +88,7 @@ or
 "REJECTED: <specific reason>"
 """
         
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500
-        )
-        
-        decision = response.choices[0].message.content.strip()
+        decision = self.llm.complete(prompt, agent="manager", call="review").strip()
         
         with open(self.decision_file, 'w') as f:
             f.write(decision)
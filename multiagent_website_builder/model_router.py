@@ -0,0 +1,105 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_ROUTES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_routes.json")
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+FALLBACK_ROUTE = {"models": [DEFAULT_MODEL], "max_tokens": 1000, "timeout_s": None}
+
+class ModelHealth:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.tripped_at = None
+
+    def record(self, latency, ok):
+        self.samples.append((latency, ok))
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+
+    def p95(self):
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)]
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+class ModelRouter:
+    def __init__(self, routes=None, p95_latency_s=30, max_error_rate=0.5, window=20, min_samples=5,
+                 cooldown_s=120):
+        self.routes = routes or {"default": FALLBACK_ROUTE}
+        self.p95_latency_s = p95_latency_s
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown_s = cooldown_s
+        self._health = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.environ.get("LLM_ROUTES_FILE", DEFAULT_ROUTES_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r') as f:
+            config = json.load(f)
+        routes = config.pop("routes", None)
+        return cls(routes, **config)
+
+    def route(self, agent=None, call=None):
+        # Most specific first: "agent.call", then "agent", then "default"
+        for name in (f"{agent}.{call}", agent, "default"):
+            if name in self.routes:
+                return dict(FALLBACK_ROUTE, **self.routes[name])
+        return dict(FALLBACK_ROUTE)
+
+    def _healthy(self, health):
+        if health.tripped_at is not None:
+            if time.monotonic() - health.tripped_at < self.cooldown_s:
+                return False
+            # Cooldown over: give the model a fresh window
+            health.samples.clear()
+            health.tripped_at = None
+        if len(health.samples) < self.min_samples:
+            return True
+        p95 = health.p95()
+        if health.error_rate() > self.max_error_rate or (p95 is not None and p95 > self.p95_latency_s):
+            health.tripped_at = time.monotonic()
+            return False
+        return True
+
+    def candidates(self, route):
+        # Configured order, with models over their latency or error budget moved to the back
+        with self._lock:
+            healthy = []
+            degraded = []
+            for model in route["models"]:
+                health = self._health.setdefault(model, ModelHealth(self.window))
+                (healthy if self._healthy(health) else degraded).append(model)
+        return healthy + degraded
+
+    def record(self, model, latency, ok=True):
+        with self._lock:
+            self._health.setdefault(model, ModelHealth(self.window)).record(latency, ok)
+
+    def stats(self):
+        with self._lock:
+            return {
+                model: {
+                    "calls": health.calls,
+                    "errors": health.errors,
+                    "p95_s": round(health.p95(), 3) if health.p95() is not None else None,
+                    "error_rate": round(health.error_rate(), 3),
+                    "degraded": health.tripped_at is not None
+                }
+                for model, health in self._health.items() if health.calls
+            }
@@ -1,96 +1,347 @@
+import argparse
 import json
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from artifact_store import ArtifactStore
+from asset_optimizer import optimize_site
+from candidates import CandidatePool, parse_weights
 from coder_agent import CoderAgent
 from tester_agent import TesterAgent
 from user_agent import UserAgent
 from manager_agent import ManagerAgent
 from deployment_agent import DeploymentAgent
+from local_checks import run_checks
+from pytest_runner import TestReport
+from state_store import EventLog
+from telemetry import get_tracer, traced_submit, export_run
+from workspace_snapshot import get_snapshot
 
 class Orchestrator:
-    def __init__(self, workspace):
+    def __init__(self, workspace, concurrent=True, stream=False, port=5000, interactive=True, deploy=True,
+                 parallel_tests=False, load_test=False, candidates=1, candidate_weights=None, optimize=True,
+                 fail_on_budget=False):
         self.workspace = workspace
-        self.state_file = os.path.join(workspace, "state.json")
-        self.coder = CoderAgent(workspace)
-        self.tester = TesterAgent(workspace)
+        self.state_file = os.path.join(workspace, "state.jsonl")
+        self.dist_dir = os.path.join(workspace, "dist")
+        self.page_weight_file = os.path.join(workspace, "page_weight.json")
+        self.state = EventLog(self.state_file)
+        self.store = ArtifactStore.for_workspace(workspace)
+        self.coder = CoderAgent(workspace, stream=stream)
+        self.tester = TesterAgent(workspace, parallel=parallel_tests)
         self.user = UserAgent(workspace)
         self.manager = ManagerAgent(workspace)
-        self.deployer = DeploymentAgent(workspace)
+        self.deployer = DeploymentAgent(workspace, port=port, interactive=interactive, load_test=load_test)
         self.max_iterations = 5
+        self.concurrent = concurrent
+        self.deploy = deploy
+        self.load_test = load_test
+        self.candidates = candidates
+        self.candidate_weights = candidate_weights
+        self.parallel_tests = parallel_tests
+        self.optimize = optimize
+        self.fail_on_budget = fail_on_budget
+        self.tracer = get_tracer()
         
-    def run(self, requirement):
-        self._update_state(requirement=requirement, iteration=0, status="running")
+    def run(self, requirement=None, resume=False):
+        self.tracer.reset()
+        try:
+            with self.tracer.span("orchestrator.run", kind="run", requirement=(requirement or "")[:200], resume=resume):
+                return self._run(requirement, resume)
+        finally:
+            export_run(self.workspace)
+            print(f"\n{self.tracer.report()}")
+            print(f"\n🔍 Trace written to: {os.path.join(self.workspace, 'trace.jsonl')}")
+    
+    def _step(self, agent, fn, *args, **kwargs):
+        with self.tracer.span(f"{agent}.{fn.__name__}", kind="agent", agent=agent):
+            return fn(*args, **kwargs)
+    
+    def _run(self, requirement, resume=False):
+        state = self.state.state() if resume else None
+        if state and state["requirement"]:
+            requirement = state["requirement"]
+            start_iteration = state["iteration"] + 1
+            print(f"\n♻️  Resuming run after iteration {state['iteration']}: {requirement}")
+            if state["status"] == "approved":
+                print("   The project was already approved")
+                return self._finish(requirement, state["iteration"], self.coder.code_file)
+        else:
+            if resume and not requirement:
+                print("\n⚠️  No run to resume")
+                return False
+            if resume:
+                print("\n⚠️  No run to resume, starting a new one")
+            self.state.append("run_started", requirement=requirement)
+            # Start from a compact log that only holds this run
+            self.state.compact()
+            start_iteration = 1
         
-        for iteration in range(1, self.max_iterations + 1):
-            print(f"\n{'='*60}")
-            print(f"ITERATION {iteration}")
-            print(f"{'='*60}\n")
-            
-            state = self._read_state()
-            feedback = state.get("feedback", [])
-            feedback_text = "\n".join(feedback) if feedback else None
-            
-            print("🔧 CODER AGENT: Generating code...")
-            code_file = self.coder.generate_code(requirement, feedback_text)
-            print(f"   Code written to: {code_file}")
-            
-            print("\n🧪 TESTER AGENT: Creating tests...")
-            test_file = self.tester.generate_tests(code_file)
-            print(f"   Tests written to: {test_file}")
-            
-            print("\n🧪 TESTER AGENT: Running tests...")
-            test_results = self.tester.run_tests()
-            print(f"   Test results:\n{test_results[:200]}...")
-            
-            print("\n👤 USER AGENT: Simulating usage...")
-            user_feedback = self.user.simulate_usage(code_file)
-            print(f"   Feedback:\n{user_feedback}")
-            
-            print("\n👔 MANAGER AGENT: Reviewing...")
-            decision = self.manager.review(requirement, code_file, test_results, user_feedback)
-            print(f"   Decision: {decision}")
-            
-            self._update_state(
-                iteration=iteration,
-                status="approved" if "APPROVED" in decision else "rejected",
-                manager_decision=decision,
-                feedback=[user_feedback] if "REJECTED" in decision else []
-            )
-            
-            if "APPROVED" in decision:
-                print(f"\n✅ PROJECT APPROVED after {iteration} iteration(s)")
-                print(f"\n📁 Output files in: {code_file}")
-                print("\nGenerated files:")
-                for root, dirs, files in os.walk(code_file):
-                    for file in files:
-                        print(f"   - {os.path.join(root, file)}")
+        for iteration in range(start_iteration, self.max_iterations + 1):
+            with self.tracer.span("iteration", kind="iteration", iteration=iteration):
+                print(f"\n{'='*60}")
+                print(f"ITERATION {iteration}")
+                print(f"{'='*60}\n")
+                
+                state = self.state.state()
+                feedback = state.get("feedback", [])
+                feedback_text = "\n".join(feedback) if feedback else None
+                # Steps already completed in this iteration before a crash are not redone
+                checkpoints = state["checkpoints"].get(str(iteration), {})
+                
+                if self.candidates > 1 and not feedback_text:
+                    print(f"🔧 CODER AGENT: Generating {self.candidates} candidates in parallel...")
+                    code_file = self._checkpointed(
+                        iteration, checkpoints, "coder",
+                        self._best_of_n, requirement, iteration, checkpoints
+                    )
+                else:
+                    print("🔧 CODER AGENT: Generating code...")
+                    code_file = self._checkpointed(
+                        iteration, checkpoints, "coder",
+                        self._step, "coder", self.coder.generate_code, requirement, feedback_text
+                    )
+                print(f"   Code written to: {code_file}")
+                
+                # One snapshot of output/ per iteration, shared by every agent until files change
+                get_snapshot(code_file)
+                # Checkpointed, so a resumed iteration reuses its manifest instead of recording a duplicate
+                manifest_id = self._checkpointed(iteration, checkpoints, "snapshot", self._snapshot, code_file, iteration)
+                
+                print("\n🔎 LOCAL CHECKS: Validating output...")
+                check_report = self._step("checks", run_checks, code_file)
+                print(f"   {check_report.summary()}")
+                for issue in check_report.issues:
+                    print(f"   - {issue.severity.upper()} {issue}")
+                
+                if not check_report.ok:
+                    # Mechanical problems go straight back to the coder without spending review calls
+                    self.store.annotate(manifest_id, decision="REJECTED: local checks failed")
+                    self.state.append(
+                        "iteration_completed",
+                        iteration=iteration,
+                        status="rejected",
+                        decision="REJECTED: local checks failed",
+                        feedback=[check_report.feedback()],
+                        manifest=manifest_id
+                    )
+                    print(f"\n❌ REJECTED by local checks - Starting next iteration...")
+                    continue
+                
+                test_report, user_feedback = self._test_and_simulate(code_file, iteration, checkpoints)
+                
+                load_results = None
+                if self.load_test:
+                    print("\n📊 LOAD TEST: Smoke-deploying for review...")
+                    load_results = self._checkpointed(iteration, checkpoints, "load_test", self._load_test)
+                    if load_results:
+                        print(f"   {load_results}")
+                
+                print("\n👔 MANAGER AGENT: Reviewing...")
+                test_results = test_report.summary()
+                if check_report.warnings:
+                    test_results += "\nLocal check warnings:\n" + "\n".join(f"- {issue}" for issue in check_report.warnings)
+                decision = self._checkpointed(
+                    iteration, checkpoints, "manager",
+                    self._step, "manager", self.manager.review, requirement, code_file, test_results, user_feedback,
+                    load_results
+                )
+                if "APPROVED" in decision and load_results and load_results.startswith("FAILED"):
+                    # Thresholds are not up to the reviewer
+                    decision = f"REJECTED: load test failed\n{load_results}"
+                print(f"   Decision: {decision}")
+                
+                next_feedback = [user_feedback]
+                if load_results and load_results.startswith("FAILED"):
+                    next_feedback.append(f"Load test:\n{load_results}")
                 
-                # Deploy and test
-                self.deployer.deploy_and_test(requirement)
+                self.store.annotate(manifest_id, decision=decision)
+                self.state.append(
+                    "iteration_completed",
+                    iteration=iteration,
+                    status="approved" if "APPROVED" in decision else "rejected",
+                    decision=decision,
+                    feedback=next_feedback if "REJECTED" in decision else [],
+                    manifest=manifest_id
+                )
                 
-                return True
-            else:
-                print(f"\n❌ REJECTED - Starting next iteration...")
+                if "APPROVED" in decision:
+                    return self._finish(requirement, iteration, code_file)
+                else:
+                    print(f"\n❌ REJECTED - Starting next iteration...")
         
         print(f"\n⚠️  Max iterations ({self.max_iterations}) reached without approval")
+        self.state.append("run_finished", status="rejected")
+        self.state.compact()
+        self._print_cache_stats()
         return False
     
-    def _read_state(self):
-        with open(self.state_file, 'r') as f:
-            return json.load(f)
+    def _finish(self, requirement, iteration, code_file):
+        print(f"\n✅ PROJECT APPROVED after {iteration} iteration(s)")
+        print(f"\n📁 Output files in: {code_file}")
+        print("\nGenerated files:")
+        for entry in get_snapshot(code_file):
+            print(f"   - {entry.abs_path}")
+        
+        self._print_cache_stats()
+        
+        if self.optimize:
+            report = self._optimize(code_file)
+            if report and not report.passed and self.fail_on_budget:
+                print("\n❌ Page-weight budget exceeded - not deploying")
+                # Recorded as a rejection, so --resume iterates on the violations instead of redeploying
+                self.state.append(
+                    "iteration_completed",
+                    iteration=iteration,
+                    status="rejected",
+                    decision="REJECTED: page-weight budget exceeded",
+                    feedback=["Page-weight budget exceeded:\n" + "\n".join(f"- {problem}" for problem in report.violations())]
+                )
+                self.state.append("run_finished", status="rejected")
+                self.state.compact()
+                return False
+        
+        self.state.append("run_finished", status="approved")
+        self.state.compact()
+        
+        # Deploy and test
+        if self.deploy:
+            self._step("deployer", self.deployer.deploy_and_test, requirement)
+        
+        return True
+    
+    def _optimize(self, code_file):
+        print("\n🗜️  ASSET OPTIMIZER: Building dist/...")
+        if not get_snapshot(code_file).is_static:
+            print("   Only static sites are optimized, output/ is deployed as is")
+            return None
+        report = self._step("optimizer", optimize_site, code_file, self.dist_dir)
+        with open(self.page_weight_file, 'w') as f:
+            json.dump(report.to_dict(), f, indent=2)
+        for line in report.summary().split("\n"):
+            print(f"   {line}")
+        print(f"   Page-weight report: {self.page_weight_file}")
+        self.deployer.static_root = self.dist_dir
+        return report
+    
+    def _snapshot(self, code_file, iteration):
+        return self.store.snapshot(code_file, f"iteration {iteration}", iteration=iteration)["id"]
+    
+    def _best_of_n(self, requirement, iteration, checkpoints):
+        pool = CandidatePool(self.workspace, self.candidates, weights=self.candidate_weights,
+                             parallel_tests=self.parallel_tests)
+        best = pool.run(requirement)
+        print(f"   🏆 Promoting candidate #{best.index} (score {best.score})")
+        changes, removed = pool.promote(best, self.coder.code_file)
+        if removed:
+            print(f"   🧹 Removed {len(removed)} file(s) the candidate does not have: {', '.join(removed)}")
+        
+        # The winner's tests already ran against identical files: reuse them for this iteration
+        if best.test_report is not None:
+            shutil.copyfile(best.test_file, self.tester.test_file)
+            result = {"test_file": self.tester.test_file, "report": best.test_report.to_dict()}
+            self.state.checkpoint(iteration, "tester", result)
+            checkpoints["tester"] = result
+        pool.cleanup()
+        return self.coder.code_file
+    
+    def _load_test(self):
+        report = self._step("deployer", self.deployer.load_test)
+        return report.summary() if report else None
+    
+    def _checkpointed(self, iteration, checkpoints, step, fn, *args, encode=None, decode=None):
+        if step in checkpoints:
+            print(f"   ♻️  Reusing checkpointed {step} result")
+            result = checkpoints[step]
+            return decode(result) if decode else result
+        result = fn(*args)
+        self.state.checkpoint(iteration, step, encode(result) if encode else result)
+        return result
     
-    def _update_state(self, **kwargs):
-        state = self._read_state()
-        state.update(kwargs)
-        with open(self.state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+    def _print_cache_stats(self):
+        stats = self.coder.llm.cache_stats()
+        print(f"\n💾 LLM cache: {stats['hits']} hits, {stats['misses']} misses")
+        scheduler = self.coder.llm.scheduler_stats()
+        if scheduler:
+            print(f"⏳ LLM queue: {scheduler['requests']} requests, {scheduler['retries']} retries, "
+                  f"{scheduler['queue_wait_total_s']:.1f}s total wait (max {scheduler['queue_wait_max_s']:.1f}s)")
+        for model, health in self.coder.llm.model_stats().items():
+            p95 = f"{health['p95_s']:.2f}s" if health["p95_s"] is not None else "n/a"
+            print(f"🧭 {model}: {health['calls']} calls, p95 {p95}, {health['error_rate']:.0%} errors"
+                  + (" (degraded)" if health["degraded"] else ""))
+    
+    def _test_and_simulate(self, code_file, iteration, checkpoints):
+        run_tests = lambda: self._checkpointed(
+            iteration, checkpoints, "tester",
+            self._generate_and_run_tests, code_file,
+            encode=lambda result: {"test_file": result[0], "report": result[1].to_dict()},
+            decode=lambda result: (result["test_file"], TestReport.from_dict(result["report"]))
+        )
+        simulate_usage = lambda: self._checkpointed(
+            iteration, checkpoints, "user",
+            self._step, "user", self.user.simulate_usage, code_file
+        )
+        
+        if not self.concurrent:
+            print("\n🧪 TESTER AGENT: Creating tests and running them...")
+            test_file, test_report = run_tests()
+            print(f"   Tests written to: {test_file}")
+            print(f"   Test results: {test_report.summary()}")
+            
+            print("\n👤 USER AGENT: Simulating usage...")
+            user_feedback = simulate_usage()
+            print(f"   Feedback:\n{user_feedback}")
+            return test_report, user_feedback
+        
+        # Tester and user agents only depend on the coder output, so run them side by side
+        # and print their results in the usual order once both have finished.
+        print("\n🧪 TESTER AGENT + 👤 USER AGENT: Running in parallel...")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            tests_future = traced_submit(pool, run_tests)
+            user_future = traced_submit(pool, simulate_usage)
+            wait([tests_future, user_future], return_when=FIRST_EXCEPTION)
+            for future in (tests_future, user_future):
+                if future.done() and future.exception():
+                    user_future.cancel()
+                    raise future.exception()
+            test_file, test_report = tests_future.result()
+            user_feedback = user_future.result()
+        
+        print("\n🧪 TESTER AGENT: Creating tests...")
+        print(f"   Tests written to: {test_file}")
+        print("\n🧪 TESTER AGENT: Running tests...")
+        print(f"   Test results: {test_report.summary()}")
+        print("\n👤 USER AGENT: Simulating usage...")
+        print(f"   Feedback:\n{user_feedback}")
+        return test_report, user_feedback
+    
+    def _generate_and_run_tests(self, code_file):
+        test_file = self._step("tester", self.tester.generate_tests, code_file)
+        return test_file, self._step("tester", self.tester.run_tests, code_file)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-agent website builder")
+    parser.add_argument("--resume", action="store_true", help="Resume the last run from its state log")
+    parser.add_argument("--load-test", action="store_true", help="Load test the project before each review")
+    parser.add_argument("--candidates", type=int, default=1, help="Generate N candidates in the first iteration")
+    parser.add_argument("--candidate-weights", help="Scoring weights, e.g. checks=3,warnings=0.2,tests=2")
+    parser.add_argument("--no-optimize", action="store_true", help="Deploy static sites without building dist/")
+    parser.add_argument("--fail-on-budget", action="store_true", help="Do not deploy when a page-weight budget is exceeded")
+    args = parser.parse_args()
+    
     workspace = os.path.dirname(os.path.abspath(__file__))
-    orchestrator = Orchestrator(workspace)
+    orchestrator = Orchestrator(workspace, load_test=args.load_test, candidates=args.candidates,
+                                candidate_weights=parse_weights(args.candidate_weights), optimize=not args.no_optimize,
+                                fail_on_budget=args.fail_on_budget)
     
     print("\n" + "="*60)
     print("🤖 MULTI-AGENT WEBSITE BUILDER")
     print("="*60)
+    
+    if args.resume:
+        print(f"\n🚀 Resuming multi-agent system...\n")
+        orchestrator.run(resume=True)
+        raise SystemExit
     print("\nWhat would you like to build?")
     print("Examples:")
     print("  - Create a portfolio website with HTML and CSS")
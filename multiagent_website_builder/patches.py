@@ -0,0 +1,65 @@
+import re
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@')
+
+class PatchError(Exception):
+    pass
+
+def _parse_hunks(diff):
+    hunks = []
+    body = None
+    for line in diff.split("\n"):
+        header = HUNK_HEADER.match(line)
+        if header:
+            body = []
+            hunks.append((int(header.group(1)), body))
+        elif body is None or line.startswith(("---", "+++", "\\")):
+            continue
+        elif line == "":
+            # Models often drop the leading space of blank context lines
+            body.append((" ", ""))
+        elif line[0] in " +-":
+            body.append((line[0], line[1:]))
+        else:
+            raise PatchError(f"Unexpected line in hunk: {line!r}")
+    return hunks
+
+def _matches(lines, index, expected):
+    if index < 0 or index + len(expected) > len(lines):
+        return False
+    return all(lines[index + i].rstrip() == line.rstrip() for i, line in enumerate(expected))
+
+def _locate(lines, expected, hint, start):
+    # Try the line number from the hunk header first, then search outwards from it. A header
+    # pointing past the end of the file is clamped, or the search would stop before reaching it
+    hint = min(max(hint, start), len(lines))
+    for offset in range(len(lines) + 1):
+        for index in (hint - offset, hint + offset):
+            if index >= start and _matches(lines, index, expected):
+                return index
+        if hint - offset < start and hint + offset > len(lines):
+            break
+    return None
+
+def apply_unified_diff(original, diff):
+    hunks = _parse_hunks(diff)
+    if not hunks:
+        raise PatchError("Patch contains no hunks")
+
+    lines = original.split("\n")
+    result = []
+    position = 0
+    for old_start, body in hunks:
+        # Trailing blank context is usually an artifact of the surrounding fence
+        while body and body[-1] == (" ", ""):
+            body.pop()
+        old = [text for op, text in body if op != "+"]
+        new = [text for op, text in body if op != "-"]
+        index = _locate(lines, old, old_start - 1, position) if old else max(old_start - 1, position)
+        if index is None:
+            raise PatchError(f"Hunk at line {old_start} does not apply")
+        result.extend(lines[position:index])
+        result.extend(new)
+        position = index + len(old)
+    result.extend(lines[position:])
+    return "\n".join(result)
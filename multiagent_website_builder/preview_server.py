@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import gzip
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+import urllib.parse
+from asset_optimizer import FINGERPRINT_NAME
+from workspace_snapshot import get_snapshot, invalidate
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+MIN_GZIP_SIZE = 1024
+IDLE_TIMEOUT = 15
+# Precompressed siblings written by the asset optimizer, best first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+class Mount:
+    # One static site served from memory. Files come from the workspace snapshot, so any
+    # invalidate(root) (e.g. after _apply_fixes) is picked up by the next request.
+    def __init__(self, root, loop):
+        self.root = os.path.abspath(root)
+        self.port = None
+        self.requests = 0
+        self._loop = loop
+        self._server = None
+        self._writers = set()
+        self._snapshot = None
+        self._gzipped = {}
+
+    async def start(self, host, port):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def reload(self):
+        invalidate(self.root)
+
+    def _files(self):
+        snapshot = get_snapshot(self.root)
+        if snapshot is not self._snapshot:
+            self._snapshot = snapshot
+            self._gzipped = {}
+        return snapshot
+
+    def _lookup(self, snapshot, path):
+        rel = posixpath.normpath(path.lstrip("/"))
+        if rel == ".":
+            rel = ""
+        # No escaping the root and no dotfiles such as .env
+        if rel.startswith("..") or any(part.startswith(".") for part in rel.split("/") if part):
+            return None
+        if not rel or path.endswith("/"):
+            candidates = [posixpath.join(rel, "index.html")]
+        else:
+            candidates = [rel, posixpath.join(rel, "index.html"), rel + ".html"]
+        for candidate in candidates:
+            entry = snapshot.get(os.path.normpath(candidate))
+            if entry is not None:
+                return entry
+        return None
+
+    def respond(self, method, target, headers):
+        if method not in ("GET", "HEAD"):
+            return 405, {"Allow": "GET, HEAD"}, b"Method Not Allowed"
+        path = urllib.parse.unquote(urllib.parse.urlsplit(target).path)
+        snapshot = self._files()
+        entry = self._lookup(snapshot, path)
+        status = 200
+        if entry is None:
+            entry = snapshot.get("404.html")
+            if entry is None:
+                return 404, {"Content-Type": "text/plain; charset=utf-8"}, b"Not Found"
+            status = 404
+
+        content_type = mimetypes.guess_type(entry.path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        etag = f'"{entry.sha256[:32]}"'
+        # Fingerprinted names change with their content, so they can be cached forever
+        cache_control = "public, max-age=31536000, immutable" if FINGERPRINT_NAME.search(entry.path) else "no-cache"
+        response_headers = {"Content-Type": content_type, "ETag": etag, "Cache-Control": cache_control,
+                            "Vary": "Accept-Encoding"}
+        if status == 200 and etag in headers.get("if-none-match", ""):
+            return 304, response_headers, b""
+
+        body = entry.data
+        accepted = {part.split(";")[0].strip() for part in headers.get("accept-encoding", "").lower().split(",")}
+        for encoding, suffix in PRECOMPRESSED:
+            precompressed = snapshot.get(entry.path + suffix)
+            if encoding in accepted and precompressed is not None:
+                response_headers["Content-Encoding"] = encoding
+                return status, response_headers, precompressed.data
+        if ("gzip" in accepted and len(body) >= MIN_GZIP_SIZE
+                and content_type.startswith(COMPRESSIBLE_TYPES)):
+            if entry.sha256 not in self._gzipped:
+                self._gzipped[entry.sha256] = gzip.compress(body, compresslevel=6)
+            body = self._gzipped[entry.sha256]
+            response_headers["Content-Encoding"] = "gzip"
+        return status, response_headers, body
+
+    async def handle(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    status, response_headers, body = 400, {}, b"Bad Request"
+                    method, version = "GET", "HTTP/1.0"
+                else:
+                    method, target, version = parts
+                    status, response_headers, body = self.respond(method, target, headers)
+                self.requests += 1
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                response_headers["Content-Length"] = str(len(body))
+                response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+                head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n" + "".join(
+                    f"{name}: {value}\r\n" for name, value in response_headers.items()
+                ) + "\r\n"
+                writer.write(head.encode("latin-1") + (body if method != "HEAD" else b""))
+                await writer.drain()
+                if not keep_alive or status == 400:
+                    break
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def close(self):
+        async def shutdown():
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+
+        if self._server is not None:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=5)
+            self._server = None
+
+class PreviewServer:
+    # A single event loop thread serving any number of mounts, each on its own port
+    def __init__(self, host=None):
+        self.host = host or os.environ.get("PREVIEW_HOST", "127.0.0.1")
+        self.mounts = []
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="preview-server", daemon=True).start()
+        return self._loop
+
+    def mount(self, root, port=0):
+        loop = self._ensure_loop()
+        mount = Mount(root, loop)
+        asyncio.run_coroutine_threadsafe(mount.start(self.host, port), loop).result()
+        with self._lock:
+            self.mounts.append(mount)
+        return mount
+
+    def unmount(self, mount):
+        mount.close()
+        with self._lock:
+            if mount in self.mounts:
+                self.mounts.remove(mount)
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_preview_server():
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = PreviewServer()
+        return _server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve one or more static sites from a single process")
+    parser.add_argument("roots", nargs="+", help="Directories to serve")
+    parser.add_argument("--port", type=int, default=8000, help="Port of the first site, the others follow")
+    args = parser.parse_args()
+
+    server = get_preview_server()
+    for index, root in enumerate(args.roots):
+        mount = server.mount(root, args.port + index)
+        print(f"🌐 {mount.root} -> http://{server.host}:{mount.port}/")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for mount in list(server.mounts):
+            server.unmount(mount)
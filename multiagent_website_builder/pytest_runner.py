@@ -0,0 +1,170 @@
+import hashlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from telemetry import get_tracer
+from workspace_snapshot import get_snapshot
+
+class TestReport:
+    def __init__(self, tests=None, duration=0.0, output="", cached=False):
+        self.tests = tests or []
+        self.duration = duration
+        self.output = output
+        self.cached = cached
+
+    def count(self, outcome):
+        return sum(1 for test in self.tests if test["outcome"] == outcome)
+
+    @property
+    def passed(self):
+        return self.count("passed")
+
+    @property
+    def failed(self):
+        return self.count("failed")
+
+    @property
+    def errors(self):
+        return self.count("error")
+
+    @property
+    def skipped(self):
+        return self.count("skipped")
+
+    @property
+    def ok(self):
+        return bool(self.tests) and not self.failed and not self.errors
+
+    def failures(self):
+        return [test for test in self.tests if test["outcome"] in ("failed", "error")]
+
+    def summary(self, max_failures=5):
+        lines = [
+            f"{self.passed} passed, {self.failed} failed, {self.errors} errors, "
+            f"{self.skipped} skipped in {self.duration:.2f}s" + (" (cached)" if self.cached else "")
+        ]
+        failures = self.failures()
+        for test in failures[:max_failures]:
+            message = (test.get("message") or "").strip().split("\n")[0][:200]
+            lines.append(f"- {test['outcome'].upper()} {test['name']}: {message}")
+        if len(failures) > max_failures:
+            lines.append(f"- ... and {len(failures) - max_failures} more")
+        slowest = sorted(self.tests, key=lambda test: test["duration"], reverse=True)[:3]
+        if slowest and slowest[0]["duration"] >= 0.5:
+            lines.append("Slowest: " + ", ".join(f"{test['name']} ({test['duration']:.2f}s)" for test in slowest))
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.summary()
+
+    def to_dict(self):
+        return {"tests": self.tests, "duration": self.duration}
+
+    @classmethod
+    def from_dict(cls, data, cached=False):
+        return cls(data["tests"], data["duration"], cached=cached)
+
+def parse_junit_xml(path):
+    root = ET.parse(path).getroot()
+    tests = []
+    duration = 0.0
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    for suite in suites:
+        duration += float(suite.get("time", 0) or 0)
+        for case in suite.iter("testcase"):
+            outcome, message = "passed", ""
+            for tag in ("failure", "error", "skipped"):
+                node = case.find(tag)
+                if node is not None:
+                    outcome = {"failure": "failed", "error": "error", "skipped": "skipped"}[tag]
+                    message = node.get("message") or (node.text or "")
+                    break
+            name = case.get("name", "")
+            if case.get("classname"):
+                name = f"{case.get('classname')}::{name}"
+            tests.append({
+                "name": name,
+                "outcome": outcome,
+                "duration": float(case.get("time", 0) or 0),
+                "message": message
+            })
+    return TestReport(tests, duration)
+
+class TestRunner:
+    def __init__(self, workspace, parallel=False, timeout=300):
+        self.workspace = workspace
+        self.parallel = parallel
+        self.timeout = timeout
+        self.results_file = os.path.join(workspace, "test_results.txt")
+        self.junit_file = os.path.join(workspace, "test_results.xml")
+        self.cache_file = os.path.join(workspace, ".test_cache.json")
+
+    def fingerprint(self, test_file, code_dir):
+        digest = hashlib.sha256()
+        with open(test_file, 'rb') as f:
+            digest.update(f.read())
+        for entry in get_snapshot(code_dir):
+            digest.update(f"{entry.path}\0{entry.sha256}\0".encode())
+        return digest.hexdigest()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache):
+        # Only keep the most recent results, enough to cover a run's iterations
+        cache = dict(list(cache.items())[-20:])
+        with open(self.cache_file, 'w') as f:
+            json.dump(cache, f)
+
+    def run(self, test_file, code_dir):
+        if not os.path.exists(test_file):
+            return TestReport(output="Tests not executed")
+
+        key = self.fingerprint(test_file, code_dir)
+        cache = self._load_cache()
+        if key in cache:
+            return TestReport.from_dict(cache[key], cached=True)
+
+        command = [sys.executable, "-m", "pytest", test_file, "-q", f"--junitxml={self.junit_file}",
+                   "-p", "no:cacheprovider"]
+        if self.parallel and importlib.util.find_spec("xdist"):
+            command += ["-n", "auto"]
+
+        if os.path.exists(self.junit_file):
+            os.remove(self.junit_file)
+        try:
+            with get_tracer().span("pytest", kind="subprocess", command=" ".join(command)):
+                result = subprocess.run(command, cwd=self.workspace, capture_output=True, text=True,
+                                        timeout=self.timeout)
+            output = result.stdout + result.stderr
+        except subprocess.TimeoutExpired as e:
+            # TimeoutExpired usually carries the partial output as bytes, even with text=True
+            partial = e.stdout or ""
+            if isinstance(partial, bytes):
+                partial = partial.decode("utf-8", errors="replace")
+            output = f"Test run timed out after {self.timeout}s\n{partial}"
+        with open(self.results_file, 'w') as f:
+            f.write(output)
+
+        try:
+            report = parse_junit_xml(self.junit_file)
+        except (OSError, ET.ParseError):
+            # No XML means pytest never got to run the tests (missing pytest, timeout, ...)
+            report = TestReport([{
+                "name": os.path.basename(test_file),
+                "outcome": "error",
+                "duration": 0.0,
+                "message": output.strip()[-500:] or "pytest did not produce results"
+            }])
+        report.output = output
+
+        cache[key] = report.to_dict()
+        self._save_cache(cache)
+        return report
@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+class TokenBucket:
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        # Take the tokens right away (the balance may go negative) and return how long the
+        # caller has to wait before they are actually available. Callers queue up in order.
+        if amount > self.capacity:
+            print(f"   ⚠️  Request of ~{amount} tokens exceeds the {self.capacity}/min bucket, "
+                  f"charging the full bucket instead")
+            amount = self.capacity
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+            self.updated = now
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.refill_per_second
+
+def status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+def is_retryable(error):
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    # Connection resets and timeouts carry no status code
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+def retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+class RequestScheduler:
+    def __init__(self, requests_per_minute=30, tokens_per_minute=None, max_retries=5,
+                 base_delay=1.0, max_delay=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Providers limit each model separately, so every model gets its own pair of buckets
+        self._buckets = {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "queue_wait_total_s": 0.0, "queue_wait_max_s": 0.0}
+
+    def _buckets_for(self, model):
+        with self._lock:
+            if model not in self._buckets:
+                rpm, tpm = self.requests_per_minute, self.tokens_per_minute
+                self._buckets[model] = (
+                    TokenBucket(rpm, rpm / 60) if rpm else None,
+                    TokenBucket(tpm, tpm / 60) if tpm else None
+                )
+            return self._buckets[model]
+
+    def _acquire(self, estimated_tokens, model):
+        requests, tokens = self._buckets_for(model)
+        wait = 0.0
+        if requests:
+            wait = requests.reserve(1)
+        if tokens and estimated_tokens:
+            wait = max(wait, tokens.reserve(estimated_tokens))
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["queue_wait_total_s"] += wait
+            self._stats["queue_wait_max_s"] = max(self._stats["queue_wait_max_s"], wait)
+
+    def run(self, call, estimated_tokens=0, model=None):
+        for attempt in range(self.max_retries + 1):
+            self._acquire(estimated_tokens, model)
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                # Prefer the server's hint, otherwise exponential backoff with full jitter
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                with self._lock:
+                    self._stats["retries"] += 1
+                print(f"   ⏳ LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_wait_avg_s"] = stats["queue_wait_total_s"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
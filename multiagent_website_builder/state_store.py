@@ -0,0 +1,109 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+def empty_state():
+    return {
+        "requirement": None,
+        "status": "new",
+        "iteration": 0,
+        "manager_decision": None,
+        "feedback": [],
+        "feedback_history": [],
+        "manifests": {},
+        "checkpoints": {}
+    }
+
+def apply_event(state, event):
+    kind = event["type"]
+    if kind == "snapshot":
+        state.clear()
+        state.update(event["state"])
+    elif kind == "run_started":
+        state.clear()
+        state.update(empty_state())
+        state["requirement"] = event["requirement"]
+        state["status"] = "running"
+    elif kind == "step":
+        state["checkpoints"].setdefault(str(event["iteration"]), {})[event["step"]] = event["result"]
+    elif kind == "iteration_completed":
+        state["iteration"] = event["iteration"]
+        state["status"] = event["status"]
+        state["manager_decision"] = event["decision"]
+        state["feedback"] = event["feedback"]
+        if event["feedback"]:
+            state["feedback_history"].append({"iteration": event["iteration"], "feedback": event["feedback"]})
+        if event.get("manifest"):
+            # Artifact store snapshot of output/ as it was reviewed
+            state.setdefault("manifests", {})[str(event["iteration"])] = event["manifest"]
+        # Checkpoints are only needed to resume an iteration that has not finished yet
+        state["checkpoints"] = {}
+    elif kind == "run_finished":
+        state["status"] = event["status"]
+    return state
+
+class EventLog:
+    def __init__(self, path, compact_every=50):
+        self.path = path
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._appended = 0
+
+    def events(self):
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # A crash mid-write can leave a torn last line; everything before it is valid
+                    break
+        return events
+
+    def state(self):
+        state = empty_state()
+        for event in self.events():
+            apply_event(state, event)
+        return state
+
+    def append(self, kind, **data):
+        event = {"type": kind, "ts": time.time(), **data}
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(event) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._appended += 1
+            if self._appended >= self.compact_every:
+                self._compact()
+        return event
+
+    def checkpoint(self, iteration, step, result):
+        return self.append("step", iteration=iteration, step=step, result=result)
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        # Replace the log with a single snapshot event, atomically
+        state = self.state()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps({"type": "snapshot", "ts": time.time(), "state": state}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600; keep the log's own mode across compactions
+        try:
+            mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, self.path)
+        self._appended = 0
@@ -0,0 +1,210 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    def __init__(self, name, kind, trace_id, parent, attributes):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attributes = attributes
+        self.start = time.time()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end or time.time()) - self.start
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def lookup(self, key):
+        # Nearest value of an attribute on this span or one of its ancestors
+        span = self
+        while span is not None:
+            if key in span.attributes:
+                return span.attributes[key]
+            span = span.parent
+        return None
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "duration_s": round(self.duration, 6),
+            "attributes": self.attributes
+        }
+
+class Tracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.trace_id = uuid.uuid4().hex
+            self.spans = []
+
+    @contextmanager
+    def span(self, name, kind="internal", **attributes):
+        span = Span(name, kind, self.trace_id, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.end = time.time()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def record_llm(self, agent, model, latency, prompt_tokens, completion_tokens, cached=False, call=None,
+                   fallback=False):
+        span = Span("llm.complete", "llm", self.trace_id, _current_span.get(), {
+            "agent": agent,
+            "call": call,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached": cached,
+            "fallback": fallback
+        })
+        span.start = time.time() - latency
+        span.end = span.start + latency
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def export_jsonl(self, path):
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, 'w') as f:
+            for span in sorted(spans, key=lambda span: span.start):
+                f.write(json.dumps(span.to_dict()) + "\n")
+
+    def export_otlp(self, path, service_name="multiagent-website-builder"):
+        # OTLP/JSON layout, loadable by OpenTelemetry collectors and most trace viewers
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        with self._lock:
+            spans = list(self.spans)
+        otlp_spans = []
+        for span in spans:
+            otlp_spans.append({
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent.span_id if span.parent else "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(int(span.start * 1e9)),
+                "endTimeUnixNano": str(int((span.end or span.start) * 1e9)),
+                "attributes": [{"key": k, "value": value(v)} for k, v in span.attributes.items() if v is not None]
+                + [{"key": "span.kind", "value": value(span.kind)}]
+            })
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": value(service_name)}]},
+            "scopeSpans": [{"scope": {"name": "telemetry"}, "spans": otlp_spans}]
+        }]}
+        with open(path, 'w') as f:
+            json.dump(payload, f)
+
+    def summary(self):
+        with self._lock:
+            spans = list(self.spans)
+
+        agents = {}
+        models = {}
+        iterations = {}
+        for span in spans:
+            agent = span.lookup("agent")
+            iteration = span.lookup("iteration")
+            if span.kind == "agent" and agent:
+                stats = agents.setdefault(agent, {"steps": 0, "step_s": 0.0, "llm_calls": 0, "llm_s": 0.0,
+                                                  "prompt_tokens": 0, "completion_tokens": 0})
+                stats["steps"] += 1
+                stats["step_s"] += span.duration
+            elif span.kind == "llm":
+                stats = agents.setdefault(agent or "unknown", {"steps": 0, "step_s": 0.0, "llm_calls": 0,
+                                                               "llm_s": 0.0, "prompt_tokens": 0,
+                                                               "completion_tokens": 0})
+                stats["llm_calls"] += 1
+                stats["llm_s"] += span.duration
+                stats["prompt_tokens"] += span.attributes.get("prompt_tokens") or 0
+                stats["completion_tokens"] += span.attributes.get("completion_tokens") or 0
+                stats = models.setdefault(span.attributes.get("model"), {"calls": 0, "llm_s": 0.0, "tokens": 0,
+                                                                         "fallbacks": 0})
+                stats["calls"] += 1
+                stats["llm_s"] += span.duration
+                stats["tokens"] += (span.attributes.get("prompt_tokens") or 0) + (span.attributes.get("completion_tokens") or 0)
+                stats["fallbacks"] += 1 if span.attributes.get("fallback") else 0
+            if iteration is None:
+                continue
+            stats = iterations.setdefault(iteration, {"duration_s": 0.0, "llm_calls": 0, "llm_s": 0.0, "tokens": 0})
+            if span.kind == "iteration":
+                stats["duration_s"] = span.duration
+            elif span.kind == "llm":
+                stats["llm_calls"] += 1
+                stats["llm_s"] += span.duration
+                stats["tokens"] += (span.attributes.get("prompt_tokens") or 0) + (span.attributes.get("completion_tokens") or 0)
+        return {"agents": agents, "models": models, "iterations": iterations}
+
+    def report(self):
+        summary = self.summary()
+        lines = ["📈 RUN REPORT", "", f"{'Agent':<10} {'Steps':>5} {'Step time':>10} {'LLM calls':>9} "
+                 f"{'LLM time':>9} {'Prompt tok':>10} {'Compl tok':>10}"]
+        for agent, stats in sorted(summary["agents"].items()):
+            lines.append(
+                f"{agent:<10} {stats['steps']:>5} {stats['step_s']:>9.2f}s {stats['llm_calls']:>9} "
+                f"{stats['llm_s']:>8.2f}s {stats['prompt_tokens']:>10} {stats['completion_tokens']:>10}"
+            )
+        lines.append("")
+        for model, stats in sorted(summary["models"].items(), key=lambda item: str(item[0])):
+            lines.append(
+                f"Model {model}: {stats['calls']} call(s), {stats['llm_s']:.2f}s, {stats['tokens']} tokens"
+                + (f", {stats['fallbacks']} as fallback" if stats["fallbacks"] else "")
+            )
+        lines.append("")
+        for iteration, stats in sorted(summary["iterations"].items()):
+            lines.append(
+                f"Iteration {iteration}: {stats['duration_s']:.2f}s, {stats['llm_calls']} LLM call(s), "
+                f"{stats['llm_s']:.2f}s in LLM, {stats['tokens']} tokens"
+            )
+        return "\n".join(lines)
+
+_tracer = Tracer()
+
+def get_tracer():
+    return _tracer
+
+def traced_submit(pool, fn, *args, **kwargs):
+    # Worker threads don't inherit context variables, so carry the current span across
+    context = contextvars.copy_context()
+    return pool.submit(context.run, fn, *args, **kwargs)
+
+def export_run(workspace):
+    tracer = get_tracer()
+    tracer.export_jsonl(os.path.join(workspace, "trace.jsonl"))
+    if os.environ.get("TRACE_OTLP") == "1":
+        tracer.export_otlp(os.path.join(workspace, "trace.otlp.json"))
@@ -1,26 +1,25 @@
 import os
-from groq import Groq
+from context_packer import ContextPacker
+from llm_client import get_client
+from pytest_runner import TestRunner
+from workspace_snapshot import get_snapshot
 
 class TesterAgent:
-    def __init__(self, workspace):
+    context_budget = 3000
+    
+    def __init__(self, workspace, parallel=False):
         self.workspace = workspace
         self.test_file = os.path.join(workspace, "test_app.py")
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self.llm = get_client()
+        self.runner = TestRunner(workspace, parallel=parallel)
         
     def generate_tests(self, code_file):
-        files = []
-        for root, dirs, filenames in os.walk(code_file):
-            for filename in filenames:
-                filepath = os.path.join(root, filename)
-                with open(filepath, 'r') as f:
-                    files.append(f"{filename}:\n{f.read()}\n")
-        
-        all_code = "\n".join(files)
+        all_code = ContextPacker(self.context_budget).pack(get_snapshot(code_file))
         
         prompt = f"""Generate comprehensive, professional tests for this project.
 
 CODE:
-{all_code[:3000]}
+{all_code}
 
 For Python: use pytest with fixtures and edge cases
 For JavaScript: use Jest with comprehensive test coverage
@@ -34,13 +33,7 @@ Create THOROUGH tests that verify:
 
 Output ONLY valid test code. No explanations."""
         
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=3000
-        )
-        
-        tests = response.choices[0].message.content.strip()
+        tests = self.llm.complete(prompt, agent="tester", call="tests").strip()
         tests = tests.replace("```python", "").replace("```", "").strip()
         
         with open(self.test_file, 'w') as f:
@@ -48,11 +41,6 @@ Output ONLY valid test code. No explanations."""
         
         return self.test_file
     
-    def run_tests(self):
-        result_file = os.path.join(self.workspace, "test_results.txt")
-        os.system(f"cd {self.workspace} && python3 -m pytest {self.test_file} -v > {result_file} 2>&1")
-        
-        if os.path.exists(result_file):
-            with open(result_file, 'r') as f:
-                return f.read()
-        return "Tests not executed"
+    def run_tests(self, code_file=None):
+        # Returns a TestReport; the run is skipped when code and tests are unchanged
+        return self.runner.run(self.test_file, code_file or os.path.join(self.workspace, "output"))
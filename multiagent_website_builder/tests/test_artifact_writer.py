@@ -0,0 +1,90 @@
+import os
+import pytest
+from artifact_writer import ArtifactWriter, FileBlockParser, UnsafePathError, parse_file_blocks
+
+RESPONSE = """Here is the project.
+
+### FILENAME: app.py
+```python
+print("hi")
+```
+
+### PATCH: templates/index.html
+```diff
+@@ -1,1 +1,1 @@
+-<p>old</p>
++<p>new</p>
+```
+"""
+
+# Parsing
+
+def test_parses_file_and_patch_blocks():
+    assert parse_file_blocks(RESPONSE) == [
+        ("file", "app.py", 'print("hi")'),
+        ("patch", "templates/index.html", "@@ -1,1 +1,1 @@\n-<p>old</p>\n+<p>new</p>"),
+    ]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 64])
+def test_blocks_split_across_stream_chunks(size):
+    parser = FileBlockParser()
+    blocks = []
+    for start in range(0, len(RESPONSE), size):
+        blocks += parser.feed(RESPONSE[start:start + size])
+    blocks += parser.close()
+    assert blocks == parse_file_blocks(RESPONSE)
+
+def test_block_is_emitted_as_soon_as_its_fence_closes():
+    parser = FileBlockParser()
+    assert parser.feed("### FILENAME: a.py\n```py\nx = 1\n") == []
+    assert parser.feed("```\n### FILENAME: b.py\n```\n") == [("file", "a.py", "x = 1")]
+
+def test_last_line_without_newline_is_flushed_on_close():
+    parser = FileBlockParser()
+    assert parser.feed("### FILENAME: a.py\n```\nx = 1\n```") == []
+    assert parser.close() == [("file", "a.py", "x = 1")]
+
+def test_unclosed_block_is_dropped():
+    assert parse_file_blocks("### FILENAME: a.py\n```\nx = 1\n") == []
+
+def test_header_must_be_followed_by_a_fence():
+    assert parse_file_blocks("### FILENAME: a.py\nx = 1\n```\ny = 2\n```") == []
+
+def test_preamble_is_kept_only_without_headers():
+    parser = FileBlockParser()
+    parser.feed("<html></html>\nmore\n")
+    parser.close()
+    assert parser.unparsed_text() == "<html></html>\nmore"
+    parser = FileBlockParser()
+    parser.feed(RESPONSE)
+    assert parser.unparsed_text() == ""
+
+# Writing
+
+@pytest.mark.parametrize("filename", ["../escape.py", "a/../../escape.py", "/etc/passwd", "..\\escape.py", ""])
+def test_paths_outside_the_output_directory_are_rejected(tmp_path, filename):
+    writer = ArtifactWriter(tmp_path / "output")
+    with pytest.raises(UnsafePathError):
+        writer.resolve(filename)
+
+def test_commit_skips_rejected_paths_and_writes_the_rest(tmp_path):
+    output = tmp_path / "output"
+    changes = ArtifactWriter(output).commit({"../escape.py": "x", "./src//app.py": "y", "index.html": "z"})
+    assert changes.rejected == ["../escape.py"]
+    assert sorted(changes.added) == ["index.html", os.path.join("src", "app.py")]
+    assert not (tmp_path / "escape.py").exists()
+    assert (output / "src" / "app.py").read_text() == "y"
+
+def test_commit_leaves_unchanged_files_alone(tmp_path):
+    writer = ArtifactWriter(tmp_path / "output")
+    writer.commit({"a.py": "1", "b.py": "2"})
+    changes = writer.commit({"a.py": "1", "b.py": "3"})
+    assert (changes.unchanged, changes.modified, bool(changes)) == (["a.py"], ["b.py"], True)
+    assert not writer.commit({"a.py": "1"})
+
+def test_prune_removes_files_and_empty_directories(tmp_path):
+    writer = ArtifactWriter(tmp_path / "output")
+    writer.commit({"a.py": "1", "old/b.py": "2", "static/c.css": "3", "static/d.css": "4"})
+    removed = writer.prune({"a.py", os.path.join("static", "c.css")})
+    assert sorted(removed) == [os.path.join("old", "b.py"), os.path.join("static", "d.css")]
+    assert sorted(os.listdir(tmp_path / "output")) == ["a.py", "static"]
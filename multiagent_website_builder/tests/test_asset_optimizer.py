@@ -0,0 +1,155 @@
+import gzip
+import os
+import shutil
+import stat
+import subprocess
+import pytest
+from asset_optimizer import MinifyError, minify_css, minify_html, minify_js, optimize_site
+
+def run_node(source, tmp_path, name):
+    path = tmp_path / name
+    path.write_text(source)
+    return subprocess.run(["node", str(path)], capture_output=True, text=True, check=True).stdout
+
+# JavaScript
+
+def test_regex_after_paren_without_whitespace_is_copied():
+    assert minify_js("if (a) /x+/.test(s)") == "if(a)/x+/.test(s)"
+
+def test_regex_after_paren_with_whitespace_is_ambiguous():
+    with pytest.raises(MinifyError):
+        minify_js("if (a) /x  y/.test(s)")
+
+def test_regex_after_brace_with_whitespace_is_ambiguous():
+    with pytest.raises(MinifyError):
+        minify_js("function f() {}\n/a b/.test(s)")
+
+def test_division_after_paren():
+    assert minify_js("var x = (a + b) / 2") == "var x=(a + b)/ 2"
+    assert minify_js("y = (a)/b/c") == "y=(a)/b/c"
+
+def test_regex_after_keyword_keeps_whitespace():
+    assert minify_js("return   /a  b/g") == "return /a  b/g"
+
+def test_regex_with_slash_in_class():
+    assert minify_js("x = /[/]  /") == "x=/[/]  /"
+
+def test_template_literals_are_verbatim():
+    source = "const s = `a   ${x + `b  ${ {y: 1}.y }`}   c`"
+    assert minify_js(source) == "const s=`a   ${x + `b  ${ {y: 1}.y }`}   c`"
+
+def test_newlines_kept_where_asi_needs_them():
+    assert minify_js("let c = a\n+ b") == "let c=a\n+ b"
+    assert minify_js("i\n++j") == "i\n++j"
+    assert minify_js("return\nvalue") == "return\nvalue"
+
+def test_newlines_dropped_after_statement_end():
+    assert minify_js("a();\n\n  b();\n") == "a();b();"
+
+def test_comments_dropped_except_license():
+    assert minify_js("/*! keep */\n// drop\nvar a = 1 /* drop */") == "/*! keep */\nvar a=1"
+
+def test_comment_markers_inside_strings():
+    assert minify_js('var s = "// no /* no */"') == 'var s="// no /* no */"'
+
+def test_closing_script_tag_inside_string():
+    assert minify_js('document.write("</script>")') == 'document.write("</script>")'
+
+def test_unterminated_literals_raise():
+    for source in ('var s = "abc\nx', "var t = `abc", "/* open", "x = /abc"):
+        with pytest.raises(MinifyError):
+            minify_js(source)
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_minified_js_behaves_the_same(tmp_path):
+    source = """
+const a = 1, b = 2
+let c = a
++ b
+const re = /ab+c\\/d[/]e/gi, half = a / b / 2
+function f(x) {
+  return x ? `t ${x + `in ${ {a: 1}.a }`}  s` : -x
+}
+let i = 0
+i
+++i
+console.log(c, re.source, half, f(1), f(0), i, a - -b, a + +b, typeof /y/, 1 .toString())
+"""
+    assert run_node(minify_js(source), tmp_path, "min.js") == run_node(source, tmp_path, "src.js")
+
+# CSS
+
+def test_css_minify():
+    source = '/* x */\nbody  {  margin : 0;\n  font-family: "A  B", sans-serif; }\n.a > .b , .c { color: red; }'
+    assert minify_css(source) == 'body{margin :0;font-family:"A  B",sans-serif}.a>.b,.c{color:red}'
+
+def test_css_keeps_calc_spacing():
+    assert minify_css(".a { width: calc(100% - 2px); }") == ".a{width:calc(100% - 2px)}"
+
+def test_css_unterminated_string_raises():
+    with pytest.raises(MinifyError):
+        minify_css('.a { content: "open; }')
+
+# HTML
+
+def test_html_minify_keeps_pre_and_conditional_comments():
+    source = "<p>a   b\n   c</p>\n<!-- drop -->\n<!--[if IE]>x<![endif]-->\n<pre>  keep\n   this</pre>"
+    assert minify_html(source) == "<p>a b\nc</p>\n\n<!--[if IE]>x<![endif]-->\n<pre>  keep\n   this</pre>"
+
+def test_inline_script_and_style_are_minified():
+    source = "<style> .a { color : red; } </style><script>\n  var a = 1 ;\n</script>"
+    assert minify_html(source) == "<style>.a{color :red}</style><script>var a=1;</script>"
+
+def test_escaped_closing_script_tag_in_inline_script():
+    source = '<script>\n  document.write("<\\/script>")\n</script>'
+    assert minify_html(source) == '<script>document.write("<\\/script>")</script>'
+
+def test_inline_script_cut_by_closing_tag_in_string_is_left_alone():
+    # The browser ends the script at the first </script> too; the broken body is not minified
+    source = '<script>\n  var s = "</script>";\n</script>'
+    assert minify_html(source).startswith('<script>\n  var s = "</script>')
+
+def test_json_script_is_not_minified():
+    source = '<script type="application/ld+json">\n  {"a":  1}\n</script>'
+    assert minify_html(source) == source
+
+# Whole site
+
+def test_optimize_site(tmp_path):
+    source = tmp_path / "output"
+    (source / "css").mkdir(parents=True)
+    (source / "js").mkdir()
+    (source / "index.html").write_text(
+        '<html><head><link rel="stylesheet" href="css/style.css"></head>\n'
+        '<body class="home"><script src="js/app.js"></script>\n'
+        '<script src="js/ambiguous.js"></script></body></html>'
+    )
+    (source / "css" / "style.css").write_text(".home { margin: 0; }\n.unused { color: red; }\n")
+    (source / "js" / "app.js").write_text("var a = 1;\n")
+    ambiguous = "function f() {}\n/a b/.test('a b')\n"
+    (source / "js" / "ambiguous.js").write_text(ambiguous)
+
+    dist = tmp_path / "dist"
+    report = optimize_site(str(source), str(dist))
+
+    assert stat.S_IMODE(os.stat(dist).st_mode) == 0o755
+    stylesheet = report.renamed["css/style.css"]
+    assert stylesheet.startswith("css/style.") and (dist / stylesheet).exists()
+    html = (dist / "index.html").read_text()
+    assert f'href="{stylesheet}"' in html and f'src="{report.renamed["js/app.js"]}"' in html
+    # Copied through unminified, but still fingerprinted
+    assert (dist / report.renamed["js/ambiguous.js"]).read_text() == ambiguous
+    assert [path for path, _ in report.unminified] == ["js/ambiguous.js"]
+    assert report.unused_css == {"css/style.css": ["unused"]}
+    assert report.passed
+
+def test_precompressed_files(tmp_path):
+    brotli = pytest.importorskip("brotli")
+    source = tmp_path / "output"
+    source.mkdir()
+    (source / "index.html").write_text("<html><body>" + "<p>hello world</p>\n" * 200 + "</body></html>")
+    dist = tmp_path / "dist"
+    optimize_site(str(source), str(dist))
+    html = (dist / "index.html").read_bytes()
+    assert gzip.decompress((dist / "index.html.gz").read_bytes()) == html
+    assert brotli.decompress((dist / "index.html.br").read_bytes()) == html
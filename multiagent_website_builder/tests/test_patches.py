@@ -0,0 +1,46 @@
+import pytest
+from patches import PatchError, apply_unified_diff
+
+ORIGINAL = "\n".join(f"line {number}" for number in range(1, 21))
+
+def test_applies_at_the_given_line():
+    diff = "@@ -3,3 +3,3 @@\n line 3\n-line 4\n+LINE 4\n line 5"
+    assert apply_unified_diff(ORIGINAL, diff).split("\n")[2:5] == ["line 3", "LINE 4", "line 5"]
+
+def test_wrong_offset_is_found_by_searching():
+    # Models get the numbers wrong; the context decides where the hunk goes
+    for start in (1, 12, 40):
+        diff = f"@@ -{start},3 +{start},3 @@\n line 8\n-line 9\n+LINE 9\n line 10"
+        lines = apply_unified_diff(ORIGINAL, diff).split("\n")
+        assert lines[7:10] == ["line 8", "LINE 9", "line 10"]
+        assert len(lines) == 20
+
+def test_context_mismatch_raises():
+    diff = "@@ -3,3 +3,3 @@\n line 3\n-line four\n+LINE 4\n line 5"
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, diff)
+
+def test_hunks_apply_in_order():
+    diff = ("--- a/app.py\n+++ b/app.py\n"
+            "@@ -2,1 +2,2 @@\n line 2\n+inserted\n"
+            "@@ -15,2 +16,1 @@\n-line 15\n line 16")
+    lines = apply_unified_diff(ORIGINAL, diff).split("\n")
+    assert lines[1:3] == ["line 2", "inserted"]
+    assert "line 15" not in lines and len(lines) == 20
+
+def test_later_hunk_cannot_match_before_an_earlier_one():
+    original = "a\nb\na\nb"
+    diff = "@@ -3,2 +3,2 @@\n a\n-b\n+B\n@@ -1,2 +1,2 @@\n a\n-b\n+C"
+    with pytest.raises(PatchError):
+        apply_unified_diff(original, diff)
+
+def test_blank_context_without_leading_space_and_trailing_whitespace():
+    original = "def f():\n    return 1   \n\nprint(f())"
+    diff = "@@ -1,4 +1,4 @@\n def f():\n-    return 1\n+    return 2\n\n print(f())\n"
+    assert apply_unified_diff(original, diff) == "def f():\n    return 2\n\nprint(f())"
+
+def test_patch_without_hunks_or_with_garbage_raises():
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, "just replace line 4")
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, "@@ -1,1 +1,1 @@\n-line 1\n+LINE 1\nsome prose")
@@ -1,23 +1,21 @@
 import os
-from groq import Groq
+from context_packer import ContextPacker
+from llm_client import get_client
+from workspace_snapshot import get_snapshot
 
 class UserAgent:
+    context_budget = 3000
+    
     def __init__(self, workspace):
         self.workspace = workspace
         self.feedback_file = os.path.join(workspace, "user_feedback.txt")
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self.llm = get_client()
         
     def simulate_usage(self, code_file):
-        files = []
-        for root, dirs, filenames in os.walk(code_file):
-            for filename in filenames:
-                filepath = os.path.join(root, filename)
-                with open(filepath, 'r') as f:
-                    files.append(f"{filename}:\n{f.read()}\n")
+        snapshot = get_snapshot(code_file)
+        all_code = ContextPacker(self.context_budget).pack(snapshot)
         
-        all_code = "\n".join(files)
-        
-        is_static = any('.html' in f for f in files) and not any('.py' in f or '.js' in f or 'package.json' in f for f in files)
+        is_static = snapshot.is_static
         
         if is_static:
             prompt = f"""You are reviewing a static HTML/CSS website. Check for:
@@ -39,7 +37,7 @@ class UserAgent:
    - Is content well-structured?
 
 CODE:
-{all_code[:3000]}
+{all_code}
 
 Respond with "No critical issues found" if the website is high-quality and professional, or list specific improvements needed."""
         else:
@@ -54,17 +52,11 @@ Check for:
 - Missing error handling
 
 PROJECT CODE:
-{all_code[:3000]}
+{all_code}
 
 Respond with specific issues found, or "No critical issues found" if code is excellent."""
         
-        response = self.client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=2000
-        )
-        
-        feedback = response.choices[0].message.content.strip()
+        feedback = self.llm.complete(prompt, agent="user", call="simulate").strip()
         
         with open(self.feedback_file, 'w') as f:
             f.write(feedback)
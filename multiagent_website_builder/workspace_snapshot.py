@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+from telemetry import get_tracer
+
+SKIP_DIRS = {"node_modules", "__pycache__", ".git", ".venv", "venv"}
+
+FILE_KINDS = {
+    ".html": "html", ".htm": "html",
+    ".css": "css", ".scss": "css",
+    ".js": "js", ".mjs": "js", ".jsx": "js", ".ts": "js", ".tsx": "js",
+    ".py": "python",
+    ".json": "json",
+    ".md": "markdown", ".txt": "text",
+    ".png": "image", ".jpg": "image", ".jpeg": "image", ".gif": "image",
+    ".svg": "image", ".webp": "image", ".ico": "image",
+}
+
+def classify(path):
+    name = os.path.basename(path)
+    if name in ("package.json", "requirements.txt", "Dockerfile", "Procfile"):
+        return "config"
+    return FILE_KINDS.get(os.path.splitext(name)[1].lower(), "other")
+
+class FileEntry:
+    def __init__(self, root, path, stat):
+        self.path = path
+        self.abs_path = os.path.join(root, path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.kind = classify(path)
+        self._data = None
+        self._text = None
+        self._sha256 = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            with open(self.abs_path, 'rb') as f:
+                self._data = f.read()
+        return self._data
+
+    @property
+    def sha256(self):
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    @property
+    def text(self):
+        # None for binary files, so prompts never include undecodable content
+        if self._text is None and self.kind != "image":
+            try:
+                self._text = self.data.decode("utf-8")
+            except UnicodeDecodeError:
+                self._text = None
+        return self._text
+
+class WorkspaceSnapshot:
+    def __init__(self, root):
+        self.root = root
+        self.files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            for filename in sorted(filenames):
+                abs_path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(abs_path)
+                except OSError:
+                    continue
+                self.files.append(FileEntry(root, os.path.relpath(abs_path, root), stat))
+        self._by_path = {entry.path: entry for entry in self.files}
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def get(self, path):
+        return self._by_path.get(path)
+
+    def paths(self):
+        return [entry.path for entry in self.files]
+
+    def kinds(self):
+        return {entry.kind for entry in self.files}
+
+    @property
+    def total_size(self):
+        return sum(entry.size for entry in self.files)
+
+    @property
+    def is_static(self):
+        # Static means HTML with no backend: no Python sources and no package.json
+        return "html" in self.kinds() and "python" not in self.kinds() and not self.get("package.json")
+
+    def render(self):
+        return "\n".join(
+            f"{entry.path}:\n{entry.text}\n" for entry in self.files if entry.text is not None
+        )
+
+_snapshots = {}
+_lock = threading.Lock()
+
+def get_snapshot(root):
+    root = os.path.abspath(root)
+    with _lock:
+        snapshot = _snapshots.get(root)
+        if snapshot is None:
+            with get_tracer().span("workspace.snapshot", kind="io", root=root) as span:
+                snapshot = WorkspaceSnapshot(root)
+                span.set(files=len(snapshot), bytes=snapshot.total_size)
+            _snapshots[root] = snapshot
+        return snapshot
+
+def invalidate(root):
+    with _lock:
+        _snapshots.pop(os.path.abspath(root), None)